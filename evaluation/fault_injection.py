@@ -0,0 +1,248 @@
+"""Exercise the gateway's upstream timeouts, retries, hedging and circuit breakers.
+
+Each scenario points ``gateway.call_service`` at a local stub server that
+follows a script of faults: answer normally, fail with 500, or stall before
+answering.  It then checks how the call behaved.  The last scenario runs the
+real services in this process with the history service replaced by a stalling
+stub, and verifies that bids keep succeeding once history's breaker opens.
+
+Usage::
+
+    python evaluation/fault_injection.py
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmark import call  # noqa: E402
+from microbenchmark import LocalCluster  # noqa: E402
+from python_architecture.common.resilience import CircuitBreaker, UpstreamPolicy  # noqa: E402
+from python_architecture.services.gateway import server as gateway_server  # noqa: E402
+from sharding_check import _check, _free_port  # noqa: E402
+
+
+class FaultyStub:
+    """Local HTTP server that answers according to a script of faults.
+
+    Each request takes the next step of ``script``, or ``default`` once the
+    script runs out.  A step is ``"ok"``, ``"error"`` (HTTP 500),
+    ``"error_list"`` (HTTP 500 with a JSON list body), or a number of seconds
+    to stall before answering ``"ok"``.
+    """
+
+    def __init__(self, script=(), default="ok"):
+        self.script = list(script)
+        self.default = default
+        self.hits = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._answer(self)
+
+            do_POST = do_GET
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _answer(self, handler):
+        with self._lock:
+            self.hits += 1
+            step = self.script.pop(0) if self.script else self.default
+        length = int(handler.headers.get("Content-Length", 0) or 0)
+        if length:
+            handler.rfile.read(length)
+        if isinstance(step, (int, float)):
+            time.sleep(step)
+            step = "ok"
+        if step == "ok":
+            status, body = 200, {"ok": True}
+        elif step == "error_list":
+            status, body = 500, ["injected failure"]
+        else:
+            status, body = 500, {"error": "injected failure"}
+        data = json.dumps(body).encode("utf-8")
+        try:
+            handler.send_response(status)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(data)))
+            handler.end_headers()
+            handler.wfile.write(data)
+        except OSError:
+            # The gateway gave up on this request already.
+            pass
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _with_policy(policy: UpstreamPolicy):
+    gateway_server.UPSTREAM_POLICIES["stub"] = policy
+
+
+def _timed(method: str, url: str, **kwargs):
+    started = time.perf_counter()
+    status, body = gateway_server.call_service(method, url, upstream="stub", **kwargs)
+    return status, body, time.perf_counter() - started
+
+
+def _counter(name: str, *labels) -> float:
+    return gateway_server.GatewayHandler.metrics.get(name).value(labels)
+
+
+def check_timeouts():
+    _with_policy(UpstreamPolicy(connect_timeout=0.2, read_timeout=0.2))
+    with FaultyStub(default=2.0) as stub:
+        status, _, elapsed = _timed("GET", f"{stub.url}/slow")
+    _check(status == 504 and elapsed < 1.0, f"a stalled upstream times out with 504 after {elapsed:.2f}s")
+
+    url = f"http://127.0.0.1:{_free_port()}"
+    status, _, elapsed = _timed("GET", f"{url}/down")
+    _check(status == 503 and elapsed < 1.0, f"an unreachable upstream fails with 503 after {elapsed:.2f}s")
+
+
+def check_retries():
+    _with_policy(UpstreamPolicy(retries=2, backoff=0.01))
+    with FaultyStub(["error", "error"]) as stub:
+        netloc = stub.url.split("//", 1)[1]
+        status, _, _ = _timed("GET", f"{stub.url}/flaky")
+        _check(status == 200 and stub.hits == 3, "a GET is retried until it succeeds (3 attempts)")
+        _check(_counter("upstream_retries_total", netloc) == 2, "retries are counted in upstream_retries_total")
+
+    with FaultyStub(["error"]) as stub:
+        status, _, _ = _timed("POST", f"{stub.url}/write", payload={})
+        _check(status == 500 and stub.hits == 1, "a non-idempotent POST is not retried")
+
+    with FaultyStub(["error"]) as stub:
+        status, _, _ = _timed("POST", f"{stub.url}/validate", payload={}, idempotent=True)
+        _check(status == 200 and stub.hits == 2, "a POST marked idempotent is retried")
+
+
+def check_hedging():
+    _with_policy(UpstreamPolicy(read_timeout=5.0, hedge_after=0.05))
+    with FaultyStub([1.5]) as stub:
+        netloc = stub.url.split("//", 1)[1]
+        status, _, elapsed = _timed("GET", f"{stub.url}/tail")
+        _check(status == 200 and elapsed < 0.5, f"a slow GET is answered by its hedge after {elapsed:.2f}s")
+        _check(_counter("upstream_hedged_requests_total", netloc) == 1, "the hedge is counted")
+
+
+def check_circuit_breaker():
+    _with_policy(UpstreamPolicy(failure_threshold=3, reset_timeout=0.3))
+    with FaultyStub(default="error") as stub:
+        netloc = stub.url.split("//", 1)[1]
+        for _ in range(3):
+            _timed("POST", f"{stub.url}/events", payload={})
+        status, body, elapsed = _timed("POST", f"{stub.url}/events", payload={})
+        _check(status == 503 and stub.hits == 3 and elapsed < 0.05,
+               f"after 3 failures the breaker rejects calls without contacting the upstream ({body['error']})")
+        _check(_counter("upstream_failures_total", netloc, "circuit_open") == 1, "rejected calls are counted")
+        states = gateway_server.GatewayHandler.metrics.get("upstream_circuit_state")
+        _check(states.value((netloc,)) == CircuitBreaker.OPEN, "upstream_circuit_state reports the open breaker")
+
+        time.sleep(0.35)
+        stub.default = "ok"
+        status, _, _ = _timed("POST", f"{stub.url}/events", payload={})
+        _check(status == 200 and states.value((netloc,)) == CircuitBreaker.CLOSED,
+               "a successful probe after reset_timeout closes the breaker")
+
+
+def check_unexpected_errors():
+    _with_policy(UpstreamPolicy(failure_threshold=1, reset_timeout=0.1))
+    with FaultyStub(["error_list"]) as stub:
+        netloc = stub.url.split("//", 1)[1]
+        status, body, _ = _timed("POST", f"{stub.url}/events", payload={})
+        _check(status == 500 and "error" in body, "a 5xx with a non-object JSON body becomes an error dict")
+
+        time.sleep(0.15)
+        try:
+            # The half-open probe fails on our side, before reaching the stub.
+            _timed("POST", f"{stub.url}/events", payload={"value": object()})
+        except TypeError:
+            pass
+        status, _, _ = _timed("POST", f"{stub.url}/events", payload={})
+        states = gateway_server.GatewayHandler.metrics.get("upstream_circuit_state")
+        _check(status == 200 and states.value((netloc,)) == CircuitBreaker.CLOSED,
+               "a probe that fails locally releases the breaker instead of leaving it stuck open")
+
+    with LocalCluster() as cluster:
+        host, port = cluster._servers["gateway"].server_address[:2]
+        with socket.create_connection((host, port), timeout=5) as sock:
+            body = json.dumps({"bidder": "chaos", "amount": 5})
+            request_head = f"POST /api/auctions/\u00e9/bid HTTP/1.0\r\nContent-Length: {len(body)}\r\n\r\n"
+            sock.sendall((request_head + body).encode("utf-8"))
+            status_line = sock.makefile("rb").readline().decode("latin-1")
+        _check(" 404 " in status_line,
+               f"a non-ASCII auction id is percent-encoded upstream ({status_line.strip()})")
+        auction = call(f"{cluster.url('gateway')}/api/auctions", {"name": "After bad id", "starting_bid": 1})
+        _check("auction" in auction, "the auction upstream keeps serving after the bad id")
+
+
+def check_degraded_history(bids: int):
+    saved = gateway_server.UPSTREAM_POLICIES["history"]
+    gateway_server.UPSTREAM_POLICIES["history"] = UpstreamPolicy(
+        connect_timeout=0.2, read_timeout=0.2, failure_threshold=2, reset_timeout=60)
+    try:
+        with LocalCluster() as cluster, FaultyStub(default=5.0) as history:
+            cluster._patch(gateway_server, "HISTORY_SERVICE", history.url)
+            gateway = cluster.url("gateway")
+            auction = call(f"{gateway}/api/auctions", {
+                "name": "Fault injection lot",
+                "starting_bid": 1,
+                "duration_seconds": 0,
+            })["auction"]["id"]
+            latencies = []
+            for idx in range(bids):
+                started = time.perf_counter()
+                resp = call(f"{gateway}/api/auctions/{auction}/bid", {"bidder": "chaos", "amount": idx + 2})
+                latencies.append(time.perf_counter() - started)
+                _check(resp["auction"]["current_bid"] == idx + 2, f"bid {idx + 1} succeeds while history stalls")
+            tail = latencies[2:]
+            _check(history.hits == 2, "history is no longer called once its breaker is open")
+            _check(max(tail) < 0.1, f"later bids skip history and finish in {max(tail) * 1000:.1f}ms at most")
+    finally:
+        gateway_server.UPSTREAM_POLICIES["history"] = saved
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check upstream fault handling against stub servers.")
+    parser.add_argument("--bids", type=int, default=6, help="bids placed while history stalls")
+    args = parser.parse_args(argv)
+    try:
+        check_timeouts()
+        check_retries()
+        check_hedging()
+        check_circuit_breaker()
+        check_unexpected_errors()
+        check_degraded_history(args.bids)
+    except AssertionError as exc:
+        print(f"FAIL {exc}")
+        return 1
+    finally:
+        gateway_server.UPSTREAM_POLICIES.pop("stub", None)
+    print("All fault-injection checks passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""In-process microbenchmarks for the Python service hot paths.
+
+Unlike ``benchmark.py`` this script does not need docker-compose: it imports
+the five Python services, starts them on ephemeral localhost ports inside the
+current process, and times both the pure helpers (route matching, auction
+cloning, expiry checks, event fan-out, JSON encoding) and full HTTP round
+trips through the gateway and frontend.
+
+Timings are compared against a JSON baseline file.  Any benchmark whose
+fastest per-operation time exceeds the baseline by more than its threshold
+(``--threshold`` for pure helpers, the looser ``--http-threshold`` for HTTP
+round trips) is reported as a regression and the script exits with status 1,
+which makes it usable as a pre-deploy gate::
+
+    python evaluation/microbenchmark.py --save-baseline   # record baseline
+    python evaluation/microbenchmark.py                   # compare against it
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from statistics import median
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmark import call, get  # noqa: E402
+from python_architecture.services.auction_service import server as auction_server  # noqa: E402
+from python_architecture.services.bidding_service import server as bidding_server  # noqa: E402
+from python_architecture.services.frontend import server as frontend_server  # noqa: E402
+from python_architecture.services.gateway import server as gateway_server  # noqa: E402
+from python_architecture.services.history_service import server as history_server  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "microbenchmark_baseline.json")
+
+
+class LocalCluster:
+    """Run every Python service on an ephemeral localhost port in this process."""
+
+    def __init__(self):
+        self._servers = {}
+        self._threads = []
+        self._saved = {}
+        self._shards = []
+
+    def url(self, service: str) -> str:
+        host, port = self._servers[service].server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        for name, module in (
+            ("auction_service", auction_server),
+            ("bidding_service", bidding_server),
+            ("history_service", history_server),
+            ("gateway", gateway_server),
+            ("frontend", frontend_server),
+        ):
+            server = module.build_server(("127.0.0.1", 0))
+            thread = threading.Thread(target=server.serve_forever, name=f"bench-{name}", daemon=True)
+            thread.start()
+            self._servers[name] = server
+            self._threads.append(thread)
+        self._shards = gateway_server.AUCTION_SHARDS
+        gateway_server.configure_auction_shards([self.url("auction_service")])
+        self._patch(gateway_server, "BIDDING_SERVICE", self.url("bidding_service"))
+        self._patch(gateway_server, "HISTORY_SERVICE", self.url("history_service"))
+        self._patch(frontend_server, "GATEWAY_URL", self.url("gateway"))
+        # SimpleHTTPRequestHandler logs every request to stderr.
+        self._patch(frontend_server.FrontendHandler, "log_message", lambda *args: None)
+        return self
+
+    def stop(self):
+        gateway_server.configure_auction_shards(self._shards)
+        for module, attribute, value in self._saved.values():
+            setattr(module, attribute, value)
+        self._saved.clear()
+        for server in self._servers.values():
+            server.shutdown()
+            server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._servers.clear()
+        self._threads.clear()
+
+    def _patch(self, module, attribute: str, value):
+        self._saved.setdefault((module.__name__, attribute), (module, attribute, getattr(module, attribute)))
+        setattr(module, attribute, value)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class Benchmark:
+    """A function timed ``number`` times per repetition.
+
+    ``reset`` runs after every repetition so each one starts from the same
+    state.  ``kind`` is ``"pure"`` or ``"http"`` and selects the regression
+    threshold, because loopback round trips are much noisier than pure code.
+    """
+
+    def __init__(self, name: str, func, number: int, reset=None, kind: str = "pure"):
+        self.name = name
+        self.func = func
+        self.number = number
+        self.reset = reset
+        self.kind = kind
+
+
+def measure(bench: Benchmark, warmup: int, repeat: int) -> dict:
+    """Time *bench* and return per-operation statistics in seconds."""
+
+    func = bench.func
+    for _ in range(warmup):
+        for _ in range(bench.number):
+            func()
+        if bench.reset:
+            bench.reset()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(bench.number):
+            func()
+        samples.append((time.perf_counter() - start) / bench.number)
+        if bench.reset:
+            bench.reset()
+    return {"median": median(samples), "min": min(samples), "max": max(samples)}
+
+
+def _sample_auction(bid_count: int = 20) -> dict:
+    now = time.time()
+    return {
+        "id": "1700000000000",
+        "name": "Benchmark item",
+        "description": "Used by the microbenchmark suite",
+        "starting_bid": 10,
+        "current_bid": 10 + bid_count,
+        "highest_bidder": f"bidder-{bid_count}",
+        "duration_seconds": 3600,
+        "status": "OPEN",
+        "status_reason": "Open for bids",
+        "closing_time": now + 3600,
+        "bids": [
+            {"bidder": f"bidder-{idx}", "amount": 10 + idx, "timestamp": now}
+            for idx in range(bid_count)
+        ],
+    }
+
+
+def pure_benchmarks():
+    auction = _sample_auction()
+    listing = {"auctions": [_sample_auction() for _ in range(100)]}
+    single = {"auction": auction}
+
+    bus = gateway_server._EventBus()
+    subscribers = [bus.subscribe() for _ in range(16)]
+
+    def drain():
+        for queue in subscribers:
+            with queue.mutex:
+                queue.queue.clear()
+
+    auction_handler = auction_server.AuctionHandler
+    gateway_handler = gateway_server.GatewayHandler
+    return [
+        Benchmark("http.match_route.auction_bid",
+                  lambda: auction_handler._match_route("POST", "/auctions/1700000000000/bid"), 20000),
+        Benchmark("http.match_route.gateway_bulk",
+                  lambda: gateway_handler._match_route("POST", "/api/auctions/1700000000000/bids/bulk"), 20000),
+        Benchmark("http.match_route.gateway_miss",
+                  lambda: gateway_handler._match_route("GET", "/api/unknown/path"), 20000),
+        Benchmark("auction.clone_auction", lambda: auction_server._clone_auction(auction), 20000),
+        Benchmark("auction.expire_if_needed", lambda: auction_server._expire_if_needed(auction), 50000),
+        Benchmark("gateway.event_bus.publish_16", lambda: bus.publish("auction", auction), 5000, reset=drain),
+        Benchmark("http.json_encode.auction", lambda: json.dumps(single).encode("utf-8"), 5000),
+        Benchmark("http.json_encode.list_100", lambda: json.dumps(listing).encode("utf-8"), 100),
+    ]
+
+
+def http_benchmarks(cluster: LocalCluster):
+    gateway = cluster.url("gateway")
+    frontend = cluster.url("frontend")
+    auction_service = cluster.url("auction_service")
+
+    def new_auction() -> str:
+        return call(f"{gateway}/api/auctions", {
+            "name": "Microbenchmark lot",
+            "description": "Bid target",
+            "starting_bid": 1,
+            "duration_seconds": 0,
+        })["auction"]["id"]
+
+    # Never bid on this one, so every GET clones the same small auction.
+    read_id = new_auction()
+
+    def bidder(base):
+        # Each auction keeps its bid history, so bidding on one auction for
+        # every repetition would make later repetitions slower.  reset() moves
+        # on to a fresh auction instead.
+        state = {"auction": new_auction(), "amount": 1}
+
+        def run():
+            state["amount"] += 1
+            call(f"{base}/api/auctions/{state['auction']}/bid", {"bidder": "bench", "amount": state["amount"]})
+
+        def reset():
+            state["auction"] = new_auction()
+            state["amount"] = 1
+
+        return run, reset
+
+    def create():
+        call(f"{gateway}/api/auctions", {
+            "name": "Microbenchmark create",
+            "starting_bid": 5,
+            "duration_seconds": 0,
+        })
+
+    gateway_bid, gateway_reset = bidder(gateway)
+    frontend_bid, frontend_reset = bidder(frontend)
+    return [
+        Benchmark("service.auction.get", lambda: get(f"{auction_service}/auctions/{read_id}"), 300, kind="http"),
+        Benchmark("gateway.create_auction", create, 150, kind="http"),
+        Benchmark("gateway.place_bid", gateway_bid, 150, gateway_reset, "http"),
+        Benchmark("frontend.place_bid", frontend_bid, 150, frontend_reset, "http"),
+    ]
+
+
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as handle:
+        return json.load(handle).get("benchmarks", {})
+
+
+def save_baseline(path: str, results: dict):
+    document = {
+        "python": sys.version.split()[0],
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "benchmarks": results,
+    }
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(document, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+def _format_us(seconds: float) -> str:
+    return f"{seconds * 1e6:12.2f}"
+
+
+def run(args) -> int:
+    baseline = {} if args.save_baseline else load_baseline(args.baseline)
+    results = {}
+    regressions = []
+    # Regressions are judged on the fastest repetition: noise only ever adds
+    # time, so the minimum is far more stable between runs than the median.
+    print(f"{'benchmark':36} {'min us':>12} {'median us':>12} {'baseline us':>12} {'change':>8}")
+
+    with LocalCluster() as cluster:
+        benches = pure_benchmarks() + http_benchmarks(cluster)
+        for bench in benches:
+            if args.filter and args.filter not in bench.name:
+                continue
+            stats = measure(bench, args.warmup, args.repeat)
+            results[bench.name] = stats
+            reference = baseline.get(bench.name, {}).get("min")
+            if reference:
+                change = stats["min"] / reference - 1
+                threshold = args.http_threshold if bench.kind == "http" else args.threshold
+                flag = ""
+                if change > threshold:
+                    regressions.append((bench.name, change, threshold))
+                    flag = "  REGRESSION"
+                print(f"{bench.name:36} {_format_us(stats['min'])} {_format_us(stats['median'])} "
+                      f"{_format_us(reference)} {change:+8.1%}{flag}")
+            else:
+                print(f"{bench.name:36} {_format_us(stats['min'])} {_format_us(stats['median'])} {'-':>12} {'-':>8}")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not baseline:
+        print(f"No baseline found at {args.baseline}; run with --save-baseline to record one.")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed beyond their threshold:")
+        for name, change, threshold in regressions:
+            print(f"  {name}: {change:+.1%} (threshold {threshold:.0%})")
+        return 1
+    print("No regressions beyond threshold.")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="record results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown of pure benchmarks before failing, as a fraction (default 0.25)")
+    parser.add_argument("--http-threshold", type=float, default=0.5,
+                        help="allowed slowdown of HTTP round-trip benchmarks (default 0.5)")
+    parser.add_argument("--repeat", type=int, default=9, help="timed repetitions per benchmark")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed warmup repetitions per benchmark")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this text")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
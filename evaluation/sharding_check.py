@@ -0,0 +1,170 @@
+"""Local end-to-end check of the sharded auction deployment.
+
+Starts N auction-service shards plus the bidding, history and gateway services
+as separate processes on free localhost ports, then verifies through the
+gateway that:
+
+* new auctions are spread across shards and each id names its owning shard,
+* bids and closes are routed to the shard that owns the auction,
+* ``GET /api/auctions`` merges every shard in id order, and paginating it with
+  ``limit``/``after`` returns the same sequence.
+
+Usage::
+
+    python evaluation/sharding_check.py --shards 3 --auctions 30
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib import error, request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmark import call, get  # noqa: E402
+from python_architecture.common.sharding import shard_from_id  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(url: str, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with request.urlopen(f"{url}/metrics", timeout=1):
+                return
+        except (error.URLError, ConnectionError):
+            time.sleep(0.05)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+
+class ProcessCluster:
+    def __init__(self, shards: int):
+        self.shards = shards
+        self.processes = []
+        self.shard_urls = []
+        self.gateway_url = ""
+
+    def _spawn(self, service: str, port_variable: str, **env) -> str:
+        port = _free_port()
+        environment = dict(os.environ, PYTHONPATH=REPO_ROOT, SERVICE=service, **env)
+        environment[port_variable] = str(port)
+        process = subprocess.Popen(
+            [sys.executable, "-m", "python_architecture.service_runner"],
+            env=environment, stdout=subprocess.DEVNULL,
+        )
+        self.processes.append(process)
+        url = f"http://127.0.0.1:{port}"
+        _wait_until_ready(url)
+        return url
+
+    def start(self):
+        for shard in range(self.shards):
+            self.shard_urls.append(
+                self._spawn("auction_service", "AUCTION_SERVICE_PORT", AUCTION_SHARD_ID=str(shard)))
+        bidding = self._spawn("bidding_service", "BIDDING_SERVICE_PORT")
+        history = self._spawn("history_service", "HISTORY_SERVICE_PORT")
+        self.gateway_url = self._spawn(
+            "gateway", "GATEWAY_PORT",
+            AUCTION_SERVICE_URLS=",".join(self.shard_urls),
+            BIDDING_SERVICE_URL=bidding,
+            HISTORY_SERVICE_URL=history,
+        )
+        return self
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def __enter__(self):
+        try:
+            return self.start()
+        except Exception:
+            self.stop()
+            raise
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _check(condition: bool, message: str):
+    if not condition:
+        raise AssertionError(message)
+    print(f"ok   {message}")
+
+
+def run_checks(cluster: ProcessCluster, auction_count: int, page_size: int):
+    gateway = cluster.gateway_url
+    created = []
+    for idx in range(auction_count):
+        resp = call(f"{gateway}/api/auctions", {
+            "name": f"Shard check {idx}",
+            "starting_bid": 10,
+            "duration_seconds": 300,
+        })
+        created.append(resp["auction"]["id"])
+
+    per_shard = []
+    for shard, url in enumerate(cluster.shard_urls):
+        ids = [auction["id"] for auction in get(f"{url}/auctions")["auctions"]]
+        per_shard.append(len(ids))
+        _check(all(shard_from_id(auction_id) == shard for auction_id in ids),
+               f"shard {shard} only holds ids tagged with shard {shard} ({len(ids)} auctions)")
+    _check(sum(per_shard) == auction_count, f"{auction_count} auctions stored across shards {per_shard}")
+    if cluster.shards > 1 and auction_count >= 4 * cluster.shards:
+        _check(all(per_shard), "every shard received at least one auction")
+
+    for auction_id in created:
+        call(f"{gateway}/api/auctions/{auction_id}/bid", {"bidder": "checker", "amount": 25})
+    closed = call(f"{gateway}/api/auctions/{created[0]}/close", {})["auction"]
+    _check(closed["status"] == "CLOSED", "close is routed to the owning shard")
+    listing = get(f"{gateway}/api/auctions")["auctions"]
+    _check(all(auction["current_bid"] == 25 for auction in listing), "bids are routed to the owning shard")
+
+    listed_ids = [auction["id"] for auction in listing]
+    _check(listed_ids == sorted(created), "merged listing is ordered by id across shards")
+
+    paged_ids = []
+    after = ""
+    while True:
+        suffix = f"&after={after}" if after else ""
+        page = get(f"{gateway}/api/auctions?limit={page_size}{suffix}")
+        paged_ids.extend(auction["id"] for auction in page["auctions"])
+        after = page.get("next_after")
+        if not after:
+            break
+    _check(paged_ids == listed_ids, f"pagination with limit={page_size} matches the full listing")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Verify sharded routing against local processes.")
+    parser.add_argument("--shards", type=int, default=3)
+    parser.add_argument("--auctions", type=int, default=30)
+    parser.add_argument("--page-size", type=int, default=7)
+    args = parser.parse_args(argv)
+    with ProcessCluster(args.shards) as cluster:
+        try:
+            run_checks(cluster, args.auctions, args.page_size)
+        except (AssertionError, RuntimeError) as exc:
+            print(f"FAIL {exc}")
+            return 1
+    print("All sharding checks passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
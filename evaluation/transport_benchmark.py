@@ -0,0 +1,71 @@
+"""Compare bid latency between HTTP and in-process (monolith) service transport.
+
+Both modes run inside this process.  In ``http`` mode the gateway reaches the
+auction, bidding and history services over loopback HTTP as it does in
+docker-compose.  In ``inproc`` mode the gateway is wired the same way as
+``SERVICE=monolith``, so its downstream calls go straight to the services'
+route tables.  In both modes the client calls the gateway over HTTP.
+
+Usage::
+
+    python evaluation/transport_benchmark.py --bids 500
+"""
+
+import argparse
+import os
+import sys
+import time
+from statistics import mean, quantiles
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmark import call  # noqa: E402
+from microbenchmark import LocalCluster  # noqa: E402
+from python_architecture.service_runner import configure_monolith  # noqa: E402
+
+
+def measure_bids(gateway: str, bids: int, warmup: int):
+    auction = call(f"{gateway}/api/auctions", {
+        "name": "Transport benchmark lot",
+        "starting_bid": 1,
+        "duration_seconds": 0,
+    })["auction"]["id"]
+    latencies = []
+    for idx in range(warmup + bids):
+        start = time.perf_counter()
+        call(f"{gateway}/api/auctions/{auction}/bid", {"bidder": "bench", "amount": idx + 2})
+        if idx >= warmup:
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(latencies):
+    cuts = quantiles(latencies, n=100)
+    return {"mean": mean(latencies), "p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare bid latency over HTTP and in-process transport.")
+    parser.add_argument("--bids", type=int, default=300, help="timed bids per mode")
+    parser.add_argument("--warmup", type=int, default=30, help="untimed bids per mode")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with LocalCluster() as cluster:
+        gateway = cluster.url("gateway")
+        results["http"] = summarize(measure_bids(gateway, args.bids, args.warmup))
+        configure_monolith()
+        results["inproc"] = summarize(measure_bids(gateway, args.bids, args.warmup))
+
+    print(f"{'mode':8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for mode, stats in results.items():
+        print(f"{mode:8} " + " ".join(f"{stats[key] * 1000:9.3f}" for key in ("mean", "p50", "p95", "p99")))
+    speedup = results["http"]["mean"] / results["inproc"]["mean"]
+    print(f"In-process transport is {speedup:.2f}x faster per bid on average.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""Admission control for the HTTP services: bounded worker pools and rate limits.
+
+``PooledHTTPServer`` replaces ``ThreadingHTTPServer``'s thread-per-connection
+model with fixed worker pools.  Each connection is assigned to a capacity class
+by peeking at its request line.  For example, long-lived SSE streams get their
+own pool so they cannot starve bids.  When every worker in a class is busy and
+its queue is full, the server answers ``503`` with ``Retry-After`` straight away
+instead of letting latency collapse for everyone.
+
+``TokenBucketLimiter`` is a keyed token-bucket rate limiter used by the gateway
+to cap bids per client IP and per bidder.
+"""
+
+import json
+import selectors
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import HTTPServer
+from queue import Queue
+from typing import Optional, Sequence, Tuple
+
+from python_architecture.common.metrics import MetricsRegistry
+
+
+class CapacityClass:
+    """A worker pool serving requests whose path starts with one of *prefixes*.
+
+    ``workers`` requests run concurrently and up to ``queue_limit`` more wait
+    for a free worker.  A class without prefixes is the fallback for requests
+    that no other class claims.
+    """
+
+    def __init__(self, name: str, workers: int, queue_limit: int = 0, prefixes: Sequence[str] = ()):
+        if workers < 1:
+            raise ValueError("a capacity class needs at least one worker")
+        self.name = name
+        self.workers = workers
+        self.queue_limit = max(0, queue_limit)
+        self.prefixes = tuple(prefixes)
+
+    def matches(self, path: str) -> bool:
+        return any(path.startswith(prefix) for prefix in self.prefixes)
+
+
+class _Pool:
+    def __init__(self, capacity: CapacityClass):
+        self.capacity = capacity
+        self.slots = threading.BoundedSemaphore(capacity.workers + capacity.queue_limit)
+        self.queue: Queue = Queue()
+        self.busy = 0
+        # Admitted connections not yet finished, queued or being served.  A
+        # connection taken off the queue is counted here before it is busy.
+        self.admitted = 0
+        self._lock = threading.Lock()
+        self.threads = []
+
+    def admit(self, item) -> bool:
+        if not self.slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self.admitted += 1
+        self.queue.put(item)
+        return True
+
+    def mark(self, delta: int):
+        with self._lock:
+            self.busy += delta
+
+    def done(self):
+        with self._lock:
+            self.admitted -= 1
+        self.slots.release()
+
+
+class PooledHTTPServer(HTTPServer):
+    """``HTTPServer`` that serves connections from bounded, per-class worker pools."""
+
+    # Seconds to wait for a request line.  Connections that send nothing in
+    # that time are closed rather than handed to a worker, so idle sockets
+    # cannot tie up the pools.
+    classify_timeout = 1.0
+    retry_after = 1
+
+    def __init__(self, server_address, RequestHandlerClass, capacity_classes: Sequence[CapacityClass],
+                 metrics: Optional[MetricsRegistry] = None, bind_and_activate: bool = True):
+        if not capacity_classes:
+            raise ValueError("PooledHTTPServer needs at least one capacity class")
+        self._pools = [_Pool(capacity) for capacity in capacity_classes]
+        fallback = [pool for pool in self._pools if not pool.capacity.prefixes]
+        self._fallback = fallback[0] if fallback else self._pools[-1]
+        self._started = False
+        self._closing = False
+        self._pending = deque()
+        # Accepted connections that are not yet in a pool: waiting for their
+        # request line, or being classified.
+        self._unclassified = 0
+        self._unclassified_lock = threading.Lock()
+        self._selector = None
+        self._wake_recv = self._wake_send = None
+        self._shed = None
+        self._idle_closed = None
+        super().__init__(server_address, RequestHandlerClass, bind_and_activate)
+        if metrics is not None:
+            self._register_metrics(metrics)
+
+    def _register_metrics(self, metrics: MetricsRegistry):
+        self._shed = metrics.get("http_requests_shed_total") or metrics.counter(
+            "http_requests_shed_total", "Connections rejected with 503 because a worker pool was full.", ("pool",))
+        self._idle_closed = metrics.get("http_idle_connections_closed_total") or metrics.counter(
+            "http_idle_connections_closed_total", "Connections closed for not sending a request line in time.")
+        busy = metrics.get("http_pool_busy_workers") or metrics.gauge(
+            "http_pool_busy_workers", "Workers currently serving a connection.", ("pool",))
+        queued = metrics.get("http_pool_queued_connections") or metrics.gauge(
+            "http_pool_queued_connections", "Connections waiting for a free worker.", ("pool",))
+        busy.set_function(lambda: {(pool.capacity.name,): pool.busy for pool in self._pools})
+        queued.set_function(lambda: {(pool.capacity.name,): pool.queue.qsize() for pool in self._pools})
+
+    # Worker threads are started lazily so that a server built before
+    # ``os.fork`` (pre-fork mode) gets fresh threads in every worker process.
+    def serve_forever(self, poll_interval: float = 0.5):
+        self._start()
+        super().serve_forever(poll_interval)
+
+    def _start(self):
+        if self._started:
+            return
+        self._started = True
+        for pool in self._pools:
+            for index in range(pool.capacity.workers):
+                thread = threading.Thread(
+                    target=self._work, args=(pool,), name=f"http-{pool.capacity.name}-{index}", daemon=True)
+                thread.start()
+                pool.threads.append(thread)
+        self._selector = selectors.DefaultSelector()
+        self._wake_recv, self._wake_send = socket.socketpair()
+        self._wake_recv.setblocking(False)
+        self._selector.register(self._wake_recv, selectors.EVENT_READ)
+        threading.Thread(target=self._classify_pending, name="http-classifier", daemon=True).start()
+
+    def idle(self) -> bool:
+        """True once every accepted connection has been answered or closed.
+
+        Covers connections still waiting for their request line and those
+        queued for a worker, not only the ones being served.  Pre-fork
+        workers drain on this before exiting.
+        """
+
+        with self._unclassified_lock:
+            if self._unclassified:
+                return False
+        return all(pool.admitted == 0 for pool in self._pools)
+
+    def _track_unclassified(self, delta: int):
+        with self._unclassified_lock:
+            self._unclassified += delta
+
+    def process_request(self, request, client_address):
+        self._start()
+        line = self._peek_request_line(request)
+        if line is None:
+            # The request line has not arrived yet; let the classifier thread
+            # wait for it so that slow clients never stall the accept loop.
+            self._track_unclassified(1)
+            self._pending.append((request, client_address, time.monotonic() + self.classify_timeout))
+            self._wake_send.send(b"\0")
+            return
+        self._dispatch(request, client_address, line)
+
+    @staticmethod
+    def _peek_request_line(request) -> Optional[bytes]:
+        request.setblocking(False)
+        try:
+            data = request.recv(2048, socket.MSG_PEEK)
+        except (BlockingIOError, InterruptedError):
+            return None
+        except OSError:
+            data = b""
+        finally:
+            request.setblocking(True)
+        return data
+
+    def _classify_pending(self):
+        waiting = {}
+        while not self._closing:
+            for key, _ in self._selector.select(timeout=0.25):
+                if key.fileobj is self._wake_recv:
+                    try:
+                        self._wake_recv.recv(4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+                request = key.fileobj
+                self._selector.unregister(request)
+                client_address, _ = waiting.pop(request)
+                self._dispatch(request, client_address, self._peek_request_line(request) or b"")
+                self._track_unclassified(-1)
+            while self._pending:
+                request, client_address, deadline = self._pending.popleft()
+                waiting[request] = (client_address, deadline)
+                self._selector.register(request, selectors.EVENT_READ)
+            now = time.monotonic()
+            for request, (client_address, deadline) in list(waiting.items()):
+                if deadline <= now:
+                    self._selector.unregister(request)
+                    del waiting[request]
+                    if self._idle_closed is not None:
+                        self._idle_closed.inc()
+                    self.shutdown_request(request)
+                    self._track_unclassified(-1)
+
+    def _classify(self, line: bytes) -> _Pool:
+        parts = line.split(b"\r\n", 1)[0].split(b" ")
+        if len(parts) >= 2:
+            path = parts[1].split(b"?", 1)[0].decode("latin-1")
+            for pool in self._pools:
+                if pool.capacity.prefixes and pool.capacity.matches(path):
+                    return pool
+        return self._fallback
+
+    def _dispatch(self, request, client_address, line: bytes):
+        pool = self._classify(line)
+        if not pool.admit((request, client_address)):
+            if self._shed is not None:
+                self._shed.inc(labels=(pool.capacity.name,))
+            self._reject(request)
+
+    def _reject(self, request):
+        body = json.dumps({"error": "server busy, retry later"}).encode("utf-8")
+        response = (
+            "HTTP/1.0 503 Service Unavailable\r\n"
+            f"Retry-After: {self.retry_after}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode("latin-1") + body
+        try:
+            request.settimeout(0.5)
+            request.sendall(response)
+            # Read what the client already sent so closing the socket does not
+            # reset the connection before the 503 is delivered.
+            request.setblocking(False)
+            while request.recv(65536):
+                pass
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def _work(self, pool: _Pool):
+        while True:
+            item = pool.queue.get()
+            if item is None:
+                return
+            request, client_address = item
+            pool.mark(1)
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                pool.mark(-1)
+                pool.done()
+
+    def server_close(self):
+        self._closing = True
+        super().server_close()
+        for pool in self._pools:
+            for _ in pool.threads:
+                pool.queue.put(None)
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets refilled at ``rate`` tokens/second up to ``burst``.
+
+    Only the ``max_keys`` most recently used keys are tracked; idle buckets are
+    evicted first, which at worst gives an evicted client a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> float:
+        """Take a token for *key*; return 0 on success or seconds until one is free."""
+
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            available, updated = self._buckets.pop(key, (self.burst, now))
+            available = min(self.burst, available + (now - updated) * self.rate)
+            if available >= 1:
+                available -= 1
+                wait = 0.0
+            else:
+                wait = (1 - available) / self.rate
+            self._buckets[key] = (available, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
@@ -1,6 +1,13 @@
 import json
+import time
 from http.server import BaseHTTPRequestHandler
-from typing import Dict, Iterable, Tuple, Union
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+from python_architecture.common import tracing
+from python_architecture.common.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from python_architecture.common.metrics import ServiceMetrics
+from python_architecture.common.tracing import TRACE_ID_HEADER, TRACEPARENT_HEADER, SpanContext
 
 
 class StreamingResponse:
@@ -12,8 +19,214 @@ class StreamingResponse:
         self.iterator = iterator
 
 
-class JSONRequestHandler(BaseHTTPRequestHandler):
+class RequestBody:
+    """Incremental reader over a request body of known length.
+
+    Routes registered with ``stream_body=True`` receive one of these instead
+    of a decoded JSON payload, so they can process uploads of any size line
+    by line without holding them in memory.
+    """
+
+    def __init__(self, stream, length: int):
+        self._stream = stream
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self._stream.read(size) if size else b""
+        self.remaining = self.remaining - len(data) if data else 0
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self._stream.readline(size) if size else b""
+        self.remaining = self.remaining - len(data) if data else 0
+        return data
+
+    def __iter__(self) -> Iterator[bytes]:
+        line = self.readline()
+        while line:
+            yield line
+            line = self.readline()
+
+
+class InvalidRequestBody(ValueError):
+    """The request body does not follow its declared transfer encoding."""
+
+
+class ChunkedRequestBody:
+    """Incremental reader over a ``Transfer-Encoding: chunked`` request body.
+
+    Offers the same interface as :class:`RequestBody` and decodes chunk
+    framing as it reads, so clients that stream uploads without knowing
+    their length are handled too.
+    """
+
+    # Longest chunk-size or trailer line accepted.
+    max_line = 1024
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._left = 0
+        self._started = False
+        self._done = False
+
+    def _next_chunk(self) -> bool:
+        """Advance to the next non-empty chunk; return False at the end of the body."""
+
+        while not self._left and not self._done:
+            if self._started and self._stream.read(2) != b"\r\n":
+                raise InvalidRequestBody("chunk data is not followed by CRLF")
+            self._started = True
+            line = self._stream.readline(self.max_line + 1)
+            if not line.endswith(b"\n"):
+                raise InvalidRequestBody("truncated or oversized chunk-size line")
+            try:
+                self._left = int(line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise InvalidRequestBody(f"invalid chunk size {line.strip()[:32]!r}") from None
+            if self._left < 0:
+                raise InvalidRequestBody("negative chunk size")
+            if not self._left:
+                self._done = True
+                # Skip trailer fields up to the blank line ending the body.
+                while True:
+                    line = self._stream.readline(self.max_line + 1)
+                    if not line.endswith(b"\n"):
+                        raise InvalidRequestBody("truncated chunked trailer")
+                    if line in (b"\r\n", b"\n"):
+                        break
+        return not self._done
+
+    def _take(self, size: int, reader) -> bytes:
+        data = reader(min(size, self._left))
+        if not data:
+            raise InvalidRequestBody("request body ended inside a chunk")
+        self._left -= len(data)
+        return data
+
+    def read(self, size: int = -1) -> bytes:
+        parts = []
+        wanted = size if size is not None and size >= 0 else None
+        while (wanted is None or wanted > 0) and self._next_chunk():
+            data = self._take(self._left if wanted is None else wanted, self._stream.read)
+            parts.append(data)
+            if wanted is not None:
+                wanted -= len(data)
+        return b"".join(parts)
+
+    def readline(self, size: int = -1) -> bytes:
+        parts = []
+        wanted = size if size is not None and size >= 0 else None
+        while (wanted is None or wanted > 0) and self._next_chunk():
+            data = self._take(self._left if wanted is None else wanted, self._stream.readline)
+            parts.append(data)
+            if wanted is not None:
+                wanted -= len(data)
+            if data.endswith(b"\n"):
+                break
+        return b"".join(parts)
+
+    def __iter__(self) -> Iterator[bytes]:
+        line = self.readline()
+        while line:
+            yield line
+            line = self.readline()
+
+
+def open_request_body(headers, stream) -> Optional[Union[RequestBody, ChunkedRequestBody]]:
+    """Return a reader for the request body described by *headers*, or None if it has none."""
+
+    if "chunked" in headers.get("Transfer-Encoding", "").lower():
+        return ChunkedRequestBody(stream)
+    length = int(headers.get("Content-Length", "0") or 0)
+    return RequestBody(stream, length) if length else None
+
+
+class _CountingStream:
+    """File wrapper that counts the bytes passing through a socket stream."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.count = 0
+
+    def read(self, *args):
+        data = self._stream.read(*args)
+        self.count += len(data)
+        return data
+
+    def readline(self, *args):
+        data = self._stream.readline(*args)
+        self.count += len(data)
+        return data
+
+    def write(self, data):
+        self.count += len(data)
+        return self._stream.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class InstrumentedHandlerMixin:
+    """Records request metrics and serves them from ``GET /metrics``.
+
+    Subclasses set ``metrics`` to their own :class:`ServiceMetrics` and
+    ``_route`` to a low-cardinality route name once the request is matched.
+    """
+
+    metrics = ServiceMetrics()
+
+    def setup(self):
+        super().setup()
+        self.rfile = _CountingStream(self.rfile)
+        self.wfile = _CountingStream(self.wfile)
+
+    def handle_one_request(self):
+        self._status = None
+        self._route = "unmatched"
+        bytes_in = self.rfile.count
+        bytes_out = self.wfile.count
+        self._in_flight = False
+        started = time.perf_counter()
+        try:
+            super().handle_one_request()
+        finally:
+            if self._in_flight:
+                self.metrics.requests_in_flight.dec()
+            if self._status is not None:
+                self.metrics.observe_request(
+                    getattr(self, "command", None) or "", self._route, self._status, time.perf_counter() - started,
+                    self.rfile.count - bytes_in, self.wfile.count - bytes_out,
+                )
+
+    def parse_request(self):
+        # Count a request as in flight once its request line has arrived, so
+        # idle connections do not hold up a draining worker.
+        if not self._in_flight:
+            self._in_flight = True
+            self.metrics.requests_in_flight.inc()
+        return super().parse_request()
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
+    def send_metrics(self):
+        self._route = "metrics"
+        body = self.metrics.render()
+        self.send_response(200)
+        self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class JSONRequestHandler(InstrumentedHandlerMixin, BaseHTTPRequestHandler):
     routes = []
+    metrics = ServiceMetrics()
 
     def do_GET(self):
         self.handle_request("GET")
@@ -29,46 +242,89 @@ class JSONRequestHandler(BaseHTTPRequestHandler):
 
     def handle_request(self, method: str):
         path = self.path.split("?")[0]
+        if method == "GET" and path == "/metrics":
+            self.send_metrics()
+            return
         handler, params = self._match_route(method, path)
         if handler is None:
             self.send_error(404, "Not Found")
             return
+        self._route = handler.__name__
+        parent = SpanContext.from_header(self.headers.get(TRACEPARENT_HEADER))
+        with tracing.tracer.span(f"{method} {self._route}", parent, type(self).__name__, "server") as span:
+            span.set_attribute("path", path)
+            stream = self._respond(handler, params)
+            span.set_attribute("status", self._status)
+        if stream is not None:
+            self._write_stream(stream)
+
+    def _respond(self, handler, params):
+        """Run *handler* and send its response, deferring streamed bodies.
+
+        Streaming responses only have their status line and headers written
+        here; the body is returned so that it is streamed outside the request
+        span rather than stretching it over the lifetime of the stream.
+        """
+
         try:
-            length = int(self.headers.get("Content-Length", "0"))
-            body = self.rfile.read(length) if length else b""
-            payload = json.loads(body.decode("utf-8")) if body else {}
+            reader = open_request_body(self.headers, self.rfile)
+            if getattr(handler, "stream_body", False):
+                payload = reader if reader is not None else RequestBody(self.rfile, 0)
+            else:
+                body = reader.read() if reader is not None else b""
+                payload = json.loads(body.decode("utf-8")) if body else {}
             response = handler(self, payload, params)
             if isinstance(response, StreamingResponse):
                 self.send_response(response.status)
                 for key, value in response.headers.items():
                     self.send_header(key, value)
+                self._send_trace_header()
                 self.end_headers()
-                try:
-                    for chunk in response.iterator:
-                        if isinstance(chunk, str):
-                            chunk = chunk.encode("utf-8")
-                        self.wfile.write(chunk)
-                        self.wfile.flush()
-                except BrokenPipeError:
-                    pass
-                finally:
-                    close_iter = getattr(response.iterator, "close", None)
-                    if callable(close_iter):
-                        try:
-                            close_iter()
-                        except Exception:
-                            pass
-                return
-
-            status, payload_body = self._normalize_response(response)
+                return response
+
+            status, payload_body, headers = self._normalize_response(response)
             self.send_response(status)
             self.send_header("Content-Type", "application/json")
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self._send_trace_header()
             self.end_headers()
             self.wfile.write(json.dumps(payload_body).encode("utf-8"))
         except json.JSONDecodeError:
             self.send_error(400, "Invalid JSON")
+        except InvalidRequestBody as exc:
+            self.send_error(400, f"Invalid request body: {exc}")
         except Exception as exc:
             self.send_error(500, f"Internal error: {exc}")
+        return None
+
+    def _send_trace_header(self):
+        span = tracing.current_span()
+        if span is not None:
+            self.send_header(TRACE_ID_HEADER, span.context.trace_id)
+
+    def _write_stream(self, response: StreamingResponse):
+        try:
+            for chunk in response.iterator:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                self.wfile.write(chunk)
+                self.wfile.flush()
+        except BrokenPipeError:
+            pass
+        finally:
+            close_iter = getattr(response.iterator, "close", None)
+            if callable(close_iter):
+                try:
+                    close_iter()
+                except Exception:
+                    pass
+
+    def query_params(self) -> Dict[str, str]:
+        """Return the query string as a dict, keeping the first of repeated keys."""
+
+        query = parse_qs(urlsplit(self.path).query)
+        return {key: values[0] for key, values in query.items()}
 
     @classmethod
     def _match_route(cls, method: str, path: str):
@@ -91,8 +347,16 @@ class JSONRequestHandler(BaseHTTPRequestHandler):
         return None, {}
 
     @classmethod
-    def route(cls, method: str, path: str):
+    def route(cls, method: str, path: str, stream_body: bool = False):
+        """Register *func* for *method* and *path*.
+
+        With ``stream_body`` the route is passed a :class:`RequestBody` to read
+        from instead of the request's decoded JSON payload.
+        """
+
         def decorator(func):
+            if stream_body:
+                func.stream_body = True
             parts = path.strip("/").split("/") if path.strip("/") else []
             cls.routes.append((method, parts, func))
             return func
@@ -104,13 +368,70 @@ class JSONRequestHandler(BaseHTTPRequestHandler):
         return
 
     @staticmethod
-    def _normalize_response(response) -> Tuple[int, Dict]:
-        if isinstance(response, tuple) and len(response) == 2:
-            status, payload_body = response
+    def _normalize_response(response) -> Tuple[int, Dict, Dict[str, str]]:
+        if isinstance(response, tuple) and len(response) in (2, 3):
+            status, payload_body = response[:2]
+            headers = response[2] if len(response) == 3 else {}
             if not isinstance(payload_body, dict):
                 raise TypeError("Handler must return a (status, dict) pair")
-            return int(status), payload_body
+            return int(status), payload_body, headers
         raise TypeError(
-            "Handlers must return either StreamingResponse or (status, dict)"
+            "Handlers must return either StreamingResponse, (status, dict) or (status, dict, headers)"
         )
 
+
+# In-process transport ------------------------------------------------------
+#
+# When several services share one process, callers can skip HTTP entirely:
+# ``register_local_service`` maps a base URL such as ``inproc://history`` to a
+# handler class, and ``dispatch_local`` runs the matching route function with
+# the caller's payload dict.  Nothing is serialized, so handlers must treat
+# payloads as read-only and callers must not mutate what they get back.
+
+_local_services: Dict[str, type] = {}
+
+
+class _LocalRequest:
+    """Stands in for the request handler passed to route functions."""
+
+    query_params = JSONRequestHandler.query_params
+
+    def __init__(self, command: str, path: str):
+        self.command = command
+        self.path = path
+        self.headers: Dict[str, str] = {}
+        self.client_address = ("inproc", 0)
+
+
+def register_local_service(base_url: str, handler_cls: type):
+    _local_services[base_url.rstrip("/")] = handler_cls
+
+
+def resolve_local_service(url: str):
+    """Return ``(handler_cls, path)`` if *url* targets an in-process service."""
+
+    parts = urlsplit(url)
+    handler_cls = _local_services.get(f"{parts.scheme}://{parts.netloc}")
+    if handler_cls is None:
+        return None
+    path = parts.path or "/"
+    return handler_cls, f"{path}?{parts.query}" if parts.query else path
+
+
+def dispatch_local(handler_cls, method: str, path: str, payload=None) -> Tuple[int, Dict]:
+    route_path = path.split("?")[0]
+    handler, params = handler_cls._match_route(method, route_path)
+    if handler is None:
+        return 404, {"error": "Not Found"}
+    started = time.perf_counter()
+    status = 500
+    with tracing.tracer.span(f"{method} {handler.__name__}", service=handler_cls.__name__, kind="server") as span:
+        span.set_attribute("path", route_path)
+        try:
+            status, body, _ = handler_cls._normalize_response(
+                handler(_LocalRequest(method, path), payload if payload is not None else {}, params))
+        except Exception as exc:
+            status, body = 500, {"error": f"Internal error: {exc}"}
+        span.set_attribute("status", status)
+    handler_cls.metrics.observe_request(method, handler.__name__, status, time.perf_counter() - started, 0, 0)
+    return status, body
@@ -0,0 +1,311 @@
+"""Minimal in-process metrics rendered in the Prometheus text format.
+
+The instruments here deliberately avoid any third-party dependency.  Each one
+keeps a dictionary keyed by the tuple of label values and guards updates with
+its own lock, so recording a sample costs a dictionary lookup and a couple of
+arithmetic operations.  That is cheap enough to leave enabled in production.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+LabelValues = Tuple[str, ...]
+GaugeCallback = Callable[[], Union[float, Dict[LabelValues, float]]]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOCK_WAIT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        lines.extend(self._samples())
+        return lines
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+    def _samples(self, extra: str = "") -> Iterable[str]:
+        """Yield sample lines; *extra* is a preformatted label added to each."""
+
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, labels: LabelValues = ()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: LabelValues = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def _samples(self, extra: str = ""):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels, extra)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """A value that can go up and down, or be computed at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[GaugeCallback] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, labels: LabelValues = ()):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, amount: float = 1.0, labels: LabelValues = ()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, labels: LabelValues = ()):
+        self.inc(-amount, labels)
+
+    def set_function(self, callback: GaugeCallback):
+        """Compute the gauge lazily from *callback* whenever it is scraped.
+
+        The callback returns either a number (for an unlabelled gauge) or a
+        mapping of label-value tuples to numbers.
+        """
+
+        self._callback = callback
+
+    def value(self, labels: LabelValues = ()) -> float:
+        return self._collect().get(labels, 0.0)
+
+    def _collect(self) -> Dict[LabelValues, float]:
+        if self._callback is not None:
+            result = self._callback()
+            if isinstance(result, dict):
+                return dict(result)
+            return {(): result}
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self, extra: str = ""):
+        for labels, value in sorted(self._collect().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels, extra)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count above the last bucket], sum
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, labels: LabelValues = ()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, labels: LabelValues = ()):
+        return _Timer(self, labels)
+
+    def count(self, labels: LabelValues = ()) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[0]) if series else 0
+
+    def _samples(self, extra: str = ""):
+        with self._lock:
+            items = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                bucket_extra = f"{extra},{le}" if extra else le
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, bucket_extra)} {cumulative}"
+            rendered = _format_labels(self.labelnames, labels, extra)
+            yield f"{self.name}_sum{rendered} {_format_value(total)}"
+            yield f"{self.name}_count{rendered} {cumulative}"
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: LabelValues):
+        self._histogram = histogram
+        self._labels = labels
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._start, self._labels)
+
+
+class TimedLock:
+    """``threading.Lock`` wrapper that records how long callers wait for it."""
+
+    def __init__(self, histogram: Histogram):
+        self._lock = threading.Lock()
+        self._histogram = histogram
+
+    def __enter__(self):
+        start = time.perf_counter()
+        self._lock.acquire()
+        self._histogram.observe(time.perf_counter() - start)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        # Other registries rendered along with this one, see attach().
+        self._attached: List[Tuple["MetricsRegistry", str]] = []
+        # Preformatted labels added to every sample, see label_all().
+        self._labels = ""
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if any(existing.name == metric.name for existing in self._metrics):
+                raise ValueError(f"metric {metric.name} is already registered")
+            self._metrics.append(metric)
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        with self._lock:
+            for metric in self._metrics:
+                if metric.name == name:
+                    return metric
+        return None
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback: Optional[GaugeCallback] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def attach(self, registry: "MetricsRegistry", **labels: str):
+        """Render *registry*'s metrics with this one, adding *labels* to each sample.
+
+        Used when several services share a process and only one of them
+        serves ``/metrics``.  Metrics with the same name are merged into one
+        family, so the attached samples are told apart by *labels*.
+        """
+
+        extra = ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+        with self._lock:
+            if all(existing is not registry for existing, _ in self._attached):
+                self._attached.append((registry, extra))
+
+    def label_all(self, **labels: str):
+        """Add *labels* to every sample this registry renders, attached ones included.
+
+        Pre-fork workers each keep their own counters, and any of them may
+        answer a scrape.  A ``worker`` label keeps their series apart, so the
+        counters never appear to go backwards between scrapes.
+        """
+
+        with self._lock:
+            self._labels = ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+
+    def render(self) -> bytes:
+        with self._lock:
+            common = self._labels
+            sources = [(list(self._metrics), common)]
+            attached = list(self._attached)
+        for registry, extra in attached:
+            with registry._lock:
+                sources.append((list(registry._metrics), ",".join(filter(None, (common, extra)))))
+        families: Dict[str, List[str]] = {}
+        for metrics, extra in sources:
+            for metric in metrics:
+                family = families.get(metric.name)
+                if family is None:
+                    family = families[metric.name] = metric.header()
+                family.extend(metric._samples(extra))
+        lines = [line for family in families.values() for line in family]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class ServiceMetrics(MetricsRegistry):
+    """Registry pre-populated with the HTTP instruments every service exposes."""
+
+    def __init__(self):
+        super().__init__()
+        self.requests_total = self.counter(
+            "http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+        self.request_duration = self.histogram(
+            "http_request_duration_seconds", "Time spent handling HTTP requests.", ("method", "route"))
+        self.requests_in_flight = self.gauge(
+            "http_requests_in_flight", "HTTP requests currently being handled.")
+        self.request_bytes = self.counter(
+            "http_request_bytes_total", "Bytes read from clients, including headers.")
+        self.response_bytes = self.counter(
+            "http_response_bytes_total", "Bytes written to clients, including headers.")
+
+    def observe_request(self, method: str, route: str, status: int, duration: float,
+                        bytes_in: int, bytes_out: int):
+        self.requests_total.inc(labels=(method, route, str(status)))
+        self.request_duration.observe(duration, (method, route))
+        if bytes_in:
+            self.request_bytes.inc(bytes_in)
+        if bytes_out:
+            self.response_bytes.inc(bytes_out)
@@ -0,0 +1,173 @@
+"""Failure-handling building blocks for calls between services.
+
+``UpstreamPolicy`` holds the timeout, retry and hedging settings for one
+downstream service.  ``CircuitBreaker`` stops sending traffic to an upstream
+after repeated failures, so callers fail fast instead of tying up threads on a
+service that is already down.
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures import wait
+from typing import Callable, Dict, Tuple
+
+
+class UpstreamPolicy:
+    """Timeouts, retries and hedging for calls to one upstream service.
+
+    ``retries`` only applies to idempotent calls.  ``hedge_after`` is the delay
+    in seconds after which a slow GET is duplicated, and 0 disables hedging.
+    """
+
+    _FIELDS = {
+        "connect_timeout": float,
+        "read_timeout": float,
+        "retries": int,
+        "backoff": float,
+        "backoff_max": float,
+        "hedge_after": float,
+        "failure_threshold": int,
+        "reset_timeout": float,
+    }
+
+    def __init__(self, connect_timeout: float = 1.0, read_timeout: float = 5.0, retries: int = 0,
+                 backoff: float = 0.05, backoff_max: float = 1.0, hedge_after: float = 0.0,
+                 failure_threshold: int = 5, reset_timeout: float = 5.0):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    @classmethod
+    def from_env(cls, name: str, **defaults) -> "UpstreamPolicy":
+        """Build a policy from *defaults* overridden by ``UPSTREAM_<NAME>``.
+
+        The variable holds comma-separated ``field=value`` pairs, for example
+        ``UPSTREAM_HISTORY="read_timeout=0.5,retries=0"``.
+        """
+
+        settings = dict(defaults)
+        raw = os.getenv(f"UPSTREAM_{name.upper()}", "")
+        for item in filter(None, (part.strip() for part in raw.split(","))):
+            key, _, value = item.partition("=")
+            key = key.strip()
+            if key not in cls._FIELDS:
+                raise ValueError(f"Unknown upstream policy field {key!r} in UPSTREAM_{name.upper()}")
+            settings[key] = cls._FIELDS[key](value)
+        return cls(**settings)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number *attempt* (1-based)."""
+
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open probe -> closed.
+
+    While open, :meth:`allow` refuses calls until ``reset_timeout`` has passed.
+    Then a single probe call is let through.  Its outcome either closes the
+    breaker again or re-opens it for another ``reset_timeout``.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 5.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """End an allowed call that produced no outcome, such as a local error.
+
+        Frees the half-open probe slot without counting a success or a
+        failure, so the next caller can probe instead of the breaker staying
+        open for good.
+        """
+
+        with self._lock:
+            self._probing = False
+
+
+class BreakerRegistry:
+    """Lazily creates one :class:`CircuitBreaker` per upstream address."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, policy: UpstreamPolicy) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(policy.failure_threshold, policy.reset_timeout)
+            return breaker
+
+    def states(self) -> Dict[Tuple[str], int]:
+        with self._lock:
+            return {(key,): breaker.state for key, breaker in self._breakers.items()}
+
+
+def hedged(executor: Executor, call: Callable[[], Tuple[int, dict]], hedge_after: float,
+           on_hedge: Callable[[], None] = None) -> Tuple[int, dict]:
+    """Run *call*, and run a duplicate if the first has not answered in time.
+
+    Returns the first successful (non-5xx) result.  If both calls fail, the
+    result of the one that finished last is returned, or its exception raised.
+    """
+
+    primary = executor.submit(call)
+    try:
+        return primary.result(timeout=hedge_after)
+    except FutureTimeout:
+        pass
+    if on_hedge is not None:
+        on_hedge()
+    pending = {primary, executor.submit(call)}
+    while True:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None and future.result()[0] < 500:
+                return future.result()
+        if not pending:
+            return done.pop().result()
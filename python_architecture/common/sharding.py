@@ -0,0 +1,73 @@
+"""Auction id scheme and consistent-hash ring used to shard the auction service.
+
+Auction ids look like ``<millis>-<sequence>-<shard>``: a zero-padded
+millisecond timestamp, a per-millisecond sequence number and the index of the
+shard that owns the auction.  Ids from one shard are strictly increasing and
+ids from all shards sort by creation time as plain strings, which lets the
+gateway merge per-shard listings without decoding them.
+"""
+
+import hashlib
+import threading
+import time
+from bisect import bisect
+from typing import List, Optional, Sequence
+
+_SEQUENCE_LIMIT = 10000
+
+
+class AuctionIdGenerator:
+    def __init__(self, shard: int = 0):
+        self.shard = shard
+        self._lock = threading.Lock()
+        self._last_millis = 0
+        self._sequence = 0
+
+    def next_id(self) -> str:
+        with self._lock:
+            millis = int(time.time() * 1000)
+            if millis <= self._last_millis:
+                # Same millisecond, or the clock stepped backwards: keep ids
+                # increasing by borrowing from the next millisecond if needed.
+                millis = self._last_millis
+                self._sequence += 1
+                if self._sequence >= _SEQUENCE_LIMIT:
+                    millis += 1
+                    self._sequence = 0
+            else:
+                self._sequence = 0
+            self._last_millis = millis
+            sequence = self._sequence
+        return f"{millis:013d}-{sequence:04d}-{self.shard}"
+
+
+def shard_from_id(auction_id: str) -> Optional[int]:
+    """Return the shard encoded in *auction_id*, or ``None`` for legacy ids."""
+
+    parts = (auction_id or "").split("-")
+    if len(parts) != 3 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8"), usedforsecurity=False).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent-hash ring mapping arbitrary keys to node indexes."""
+
+    def __init__(self, nodes: Sequence[str], replicas: int = 128):
+        if not nodes:
+            raise ValueError("HashRing needs at least one node")
+        points = []
+        for index, node in enumerate(nodes):
+            for replica in range(replicas):
+                points.append((_hash(f"{node}#{replica}"), index))
+        points.sort()
+        self._hashes: List[int] = [point for point, _ in points]
+        self._nodes: List[int] = [index for _, index in points]
+
+    def node_for(self, key: str) -> int:
+        position = bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[position]
@@ -0,0 +1,211 @@
+"""Lightweight request tracing propagated with the W3C ``traceparent`` header.
+
+Each service opens a server span around every handled request and the
+gateway opens a client span around every downstream call.  The active span is
+tracked per thread, and outgoing requests carry its context so that downstream
+server spans are recorded as its children.
+
+Every response carries the trace id in ``X-Trace-Id``.
+
+Sampling is decided once, when a trace starts: ``TRACE_SAMPLE_RATE`` (0.0 to
+1.0, default 0) sets the fraction of new traces that are recorded, and
+downstream services follow the flag in the incoming header.  Sampled spans are
+appended as JSON lines to ``TRACE_EXPORT_PATH`` and the file is rotated once it
+reaches ``TRACE_EXPORT_MAX_BYTES``.  Pre-fork workers each write their own
+``TRACE_EXPORT_PATH.worker-<n>`` file.  Use ``python -m
+python_architecture.trace_report`` to list the slowest traces.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Optional
+
+TRACEPARENT_HEADER = "traceparent"
+# Echoed on responses so that clients can quote the trace of a slow request.
+TRACE_ID_HEADER = "X-Trace-Id"
+
+_local = threading.local()
+
+
+class SpanContext:
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    def to_header(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    @classmethod
+    def from_header(cls, value: Optional[str]) -> Optional["SpanContext"]:
+        if not value:
+            return None
+        parts = value.strip().split("-")
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        try:
+            int(parts[1], 16)
+            int(parts[2], 16)
+            flags = int(parts[3], 16)
+        except ValueError:
+            return None
+        return cls(parts[1], parts[2], bool(flags & 1))
+
+
+class Span:
+    __slots__ = ("context", "parent_id", "name", "service", "kind", "attributes", "start", "_started", "duration")
+
+    def __init__(self, name: str, context: SpanContext, parent_id: Optional[str], service: str, kind: str):
+        self.context = context
+        self.parent_id = parent_id
+        self.name = name
+        self.service = service
+        self.kind = kind
+        self.attributes: Dict[str, object] = {}
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration = 0.0
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "kind": self.kind,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes,
+        }
+
+
+class JsonLinesExporter:
+    """Append finished spans to a size-rotated JSON-lines file."""
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._logger = logging.getLogger(f"{__name__}.exporter.{path}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        if not self._logger.handlers:
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(handler)
+
+    def export(self, span: Span):
+        self._logger.info(json.dumps(span.to_dict(), separators=(",", ":")))
+
+
+class Tracer:
+    def __init__(self, sample_rate: float = 0.0, exporter: Optional[JsonLinesExporter] = None):
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    def start_span(self, name: str, parent: Optional[SpanContext] = None, service: str = "",
+                   kind: str = "internal") -> Span:
+        if parent is None:
+            parent = current_context()
+        if parent is None:
+            context = SpanContext(_random_id(128), _random_id(64), random.random() < self.sample_rate)
+            parent_id = None
+        else:
+            context = SpanContext(parent.trace_id, _random_id(64), parent.sampled)
+            parent_id = parent.span_id
+        return Span(name, context, parent_id, service, kind)
+
+    def span(self, name: str, parent: Optional[SpanContext] = None, service: str = "", kind: str = "internal"):
+        return _ActiveSpan(self, self.start_span(name, parent, service, kind))
+
+    def finish(self, span: Span):
+        span.duration = time.perf_counter() - span._started
+        if span.context.sampled and self.exporter is not None:
+            self.exporter.export(span)
+
+
+class _ActiveSpan:
+    def __init__(self, tracer: Tracer, span: Span):
+        self._tracer = tracer
+        self._span = span
+        self._previous = None
+
+    def __enter__(self) -> Span:
+        self._previous = getattr(_local, "span", None)
+        _local.span = self._span
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self._span.set_attribute("error", repr(exc))
+        _local.span = self._previous
+        self._tracer.finish(self._span)
+
+
+def _random_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def current_span() -> Optional[Span]:
+    return getattr(_local, "span", None)
+
+
+def current_context() -> Optional[SpanContext]:
+    span = current_span()
+    return span.context if span is not None else None
+
+
+def bind(func):
+    """Wrap *func* so it runs under the caller's active span in another thread."""
+
+    span = current_span()
+
+    def bound(*args, **kwargs):
+        previous = getattr(_local, "span", None)
+        _local.span = span
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.span = previous
+
+    return bound
+
+
+def _tracer_from_env() -> Tracer:
+    sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "0") or 0)
+    # The exporter opens its file lazily, so nothing is written unless a
+    # trace is sampled here or by an upstream caller.
+    exporter = JsonLinesExporter(
+        os.getenv("TRACE_EXPORT_PATH", "traces.jsonl"),
+        int(os.getenv("TRACE_EXPORT_MAX_BYTES", str(10 * 1024 * 1024))),
+        int(os.getenv("TRACE_EXPORT_BACKUPS", "3")),
+    )
+    return Tracer(sample_rate, exporter)
+
+
+def export_per_worker(worker: int):
+    """Write this process's spans to its own file, for pre-fork worker *worker*.
+
+    Rotating one file from several processes loses spans, so each worker
+    appends ``.worker-<n>`` to ``TRACE_EXPORT_PATH``.  ``trace_report`` merges
+    the files again.
+    """
+
+    exporter = tracer.exporter
+    if exporter is not None:
+        tracer.exporter = JsonLinesExporter(
+            f"{exporter.path}.worker-{worker}", exporter.max_bytes, exporter.backup_count)
+
+
+tracer = _tracer_from_env()
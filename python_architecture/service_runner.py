@@ -5,15 +5,51 @@ provides for each container, imports the corresponding service module, and
 invokes its ``run`` or ``main`` callable.  Centralising the logic in this
 module avoids relying on shell-style environment variable expansion inside the
 Dockerfile command while keeping service modules focused on business logic.
+
+Stateless services can also run in pre-fork mode by setting ``WORKERS`` to a
+number greater than one (or ``auto`` for one per CPU).  The runner then binds
+the listening socket once, forks that many worker processes that all accept
+from it, restarts workers that crash, and drains them on ``SIGTERM``.  Workers
+of a service that defines ``bind_fanout`` are connected through the
+supervisor, which relays each worker's messages to its siblings.  A service
+that defines ``scale_limits`` is told the worker count before forking, so that
+per-process limits can add up to the configured total.  Each worker labels its
+metrics with its index and writes its trace spans to its own file.
+
+``SERVICE=monolith`` hosts the auction, bidding, history and gateway services
+in one process.  Only the gateway listens on a port; its downstream calls are
+dispatched straight to the other services' route tables without HTTP or JSON.
 """
 
 from __future__ import annotations
 
 import importlib
+import json
 import os
+import selectors
+import signal
+import socket
 import sys
+import threading
+import time
+import traceback
 from types import ModuleType
-from typing import Callable
+from typing import Callable, Dict, Optional
+
+from python_architecture.common import tracing
+
+# Services hosted together by ``SERVICE=monolith`` and the handler class that
+# serves each of them in-process.
+MONOLITH_SERVICES = {
+    "auction_service": "AuctionHandler",
+    "bidding_service": "BiddingHandler",
+    "history_service": "HistoryHandler",
+}
+
+# Services whose state lives entirely in their upstreams, so several copies can
+# share one port.  The auction and history services keep in-memory state and
+# always run as a single process.
+PREFORK_SERVICES = {"bidding_service", "frontend", "gateway"}
 
 
 def _resolve_entrypoint(module: ModuleType) -> Callable[[], None]:
@@ -33,6 +69,255 @@ def _resolve_entrypoint(module: ModuleType) -> Callable[[], None]:
     )
 
 
+def _worker_count() -> int:
+    raw = os.environ.get("WORKERS", "1").strip().lower()
+    if raw == "auto":
+        return os.cpu_count() or 1
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        print(f"Ignoring invalid WORKERS value {raw!r}", file=sys.stderr)
+        return 1
+
+
+class _FanoutChannel:
+    """A worker's newline-delimited JSON link to the supervisor's relay."""
+
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+        self._send_lock = threading.Lock()
+
+    def send(self, message) -> None:
+        data = json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._send_lock:
+            try:
+                self._sock.sendall(data)
+            except OSError:
+                pass
+
+    def start(self, callback: Callable[[object], None]) -> None:
+        def pump() -> None:
+            with self._sock.makefile("rb") as stream:
+                for line in stream:
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        continue
+                    if message is not None:
+                        callback(message)
+
+        threading.Thread(target=pump, name="fanout-reader", daemon=True).start()
+
+
+def _handler_metrics(server):
+    handler = server.RequestHandlerClass
+    handler = getattr(handler, "func", handler)  # unwrap functools.partial
+    return getattr(handler, "metrics", None)
+
+
+def _idle(server) -> bool:
+    # A pooled server also knows about connections queued for a worker or
+    # still waiting for their request line.
+    idle = getattr(server, "idle", None)
+    if callable(idle):
+        return idle()
+    metrics = _handler_metrics(server)
+    return metrics is None or metrics.requests_in_flight.value() == 0
+
+
+def _run_worker(module: ModuleType, server, worker: int, channel: Optional[socket.socket],
+                drain_timeout: float) -> None:
+    """Serve requests in a forked worker until SIGTERM, then drain and exit."""
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Every worker counts on its own, so its metrics and spans are kept apart
+    # from its siblings'.
+    metrics = _handler_metrics(server)
+    if metrics is not None:
+        metrics.label_all(worker=worker)
+    tracing.export_per_worker(worker)
+    signal.signal(
+        signal.SIGTERM,
+        lambda signum, frame: threading.Thread(target=server.shutdown, daemon=True).start(),
+    )
+    bind_fanout = getattr(module, "bind_fanout", None)
+    if channel is not None and callable(bind_fanout):
+        bind_fanout(_FanoutChannel(channel))
+
+    server.serve_forever()
+
+    drain = getattr(module, "drain", None)
+    if callable(drain):
+        drain()
+    deadline = time.monotonic() + drain_timeout
+    while not _idle(server) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+class _Supervisor:
+    """Fork, relay between, restart and stop the workers of one service."""
+
+    def __init__(self, module: ModuleType, server, workers: int, drain_timeout: float):
+        self.module = module
+        self.server = server
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self.fanout = callable(getattr(module, "bind_fanout", None))
+        self._children: Dict[int, Optional[socket.socket]] = {}
+        # Worker index of each child pid; a replacement reuses the index.
+        self._indexes: Dict[int, int] = {}
+        self._buffers: Dict[socket.socket, bytes] = {}
+        self._selector = selectors.DefaultSelector()
+        self._stopping = False
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        for index in range(self.workers):
+            self._spawn(index)
+        last_spawn = time.monotonic()
+        while not self._stopping:
+            for key, _ in self._selector.select(timeout=0.5):
+                self._relay(key.fileobj)
+            for index in self._reap():
+                if self._stopping:
+                    break
+                # Back off briefly when workers die right after starting so a
+                # broken deployment does not turn into a tight fork loop.
+                if time.monotonic() - last_spawn < 1.0:
+                    time.sleep(1.0)
+                print("Worker exited; starting a replacement", file=sys.stderr)
+                self._spawn(index)
+                last_spawn = time.monotonic()
+        self._shutdown()
+
+    def _request_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _spawn(self, index: int) -> None:
+        parent_end = child_end = None
+        if self.fanout:
+            parent_end, child_end = socket.socketpair()
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                self._selector.close()
+                for sock in self._children.values():
+                    if sock is not None:
+                        sock.close()
+                if parent_end is not None:
+                    parent_end.close()
+                _run_worker(self.module, self.server, index, child_end, self.drain_timeout)
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                os._exit(status)
+        if child_end is not None:
+            child_end.close()
+            self._selector.register(parent_end, selectors.EVENT_READ)
+            self._buffers[parent_end] = b""
+        self._children[pid] = parent_end
+        self._indexes[pid] = index
+
+    def _relay(self, source: socket.socket) -> None:
+        try:
+            data = source.recv(65536)
+        except OSError:
+            data = b""
+        if not data:
+            self._forget(source)
+            return
+        buffered = self._buffers.get(source, b"") + data
+        complete, _, remainder = buffered.rpartition(b"\n")
+        self._buffers[source] = remainder
+        if not complete:
+            return
+        payload = complete + b"\n"
+        for sock in list(self._children.values()):
+            if sock is None or sock is source:
+                continue
+            try:
+                sock.sendall(payload)
+            except OSError:
+                self._forget(sock)
+
+    def _forget(self, sock: socket.socket) -> None:
+        if sock in self._buffers:
+            self._buffers.pop(sock)
+            self._selector.unregister(sock)
+            sock.close()
+
+    def _reap(self):
+        """Yield the index of every worker that has exited since the last call."""
+
+        while self._children:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            sock = self._children.pop(pid, None)
+            if sock is not None:
+                self._forget(sock)
+            yield self._indexes.pop(pid)
+
+    def _shutdown(self) -> None:
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.drain_timeout + 5
+        while self._children and time.monotonic() < deadline:
+            for _ in self._reap():
+                pass
+            time.sleep(0.05)
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        for _ in self._reap():
+            pass
+        self.server.server_close()
+
+
+def _run_prefork(module: ModuleType, workers: int) -> None:
+    build_server = getattr(module, "build_server", None)
+    if not callable(build_server):
+        raise AttributeError(f"Module {module.__name__} does not define 'build_server' for pre-fork mode")
+    server = build_server()
+    scale_limits = getattr(module, "scale_limits", None)
+    if callable(scale_limits):
+        scale_limits(workers)
+    drain_timeout = float(os.environ.get("WORKER_DRAIN_TIMEOUT", "10"))
+    print(f"{module.__name__} listening on {server.server_address[1]} with {workers} workers")
+    sys.stdout.flush()
+    _Supervisor(module, server, workers, drain_timeout).run()
+
+
+def configure_monolith() -> ModuleType:
+    """Wire the gateway to in-process copies of its downstream services."""
+
+    from python_architecture.common.http import register_local_service
+
+    gateway = importlib.import_module("python_architecture.services.gateway.server")
+    for service, handler_name in MONOLITH_SERVICES.items():
+        module = importlib.import_module(f"python_architecture.services.{service}.server")
+        handler_cls = getattr(module, handler_name)
+        register_local_service(f"inproc://{service}", handler_cls)
+        # Only the gateway listens, so its /metrics also serves the hosted
+        # services' metrics, labelled with the service they belong to.
+        gateway.GatewayHandler.metrics.attach(handler_cls.metrics, service=service)
+    gateway.configure_auction_shards(["inproc://auction_service"])
+    gateway.BIDDING_SERVICE = "inproc://bidding_service"
+    gateway.HISTORY_SERVICE = "inproc://history_service"
+    return gateway
+
+
 def main() -> None:
     """Module entrypoint executed by ``python -m``."""
 
@@ -41,6 +326,12 @@ def main() -> None:
         print("SERVICE environment variable is required", file=sys.stderr)
         raise SystemExit(2)
 
+    if service == "monolith":
+        if _worker_count() > 1:
+            print("monolith keeps in-memory state; ignoring WORKERS", file=sys.stderr)
+        configure_monolith().run()
+        return
+
     module_name = f"python_architecture.services.{service}.server"
     try:
         module = importlib.import_module(module_name)
@@ -48,6 +339,13 @@ def main() -> None:
         print(f"Unable to import {module_name}: {exc}", file=sys.stderr)
         raise SystemExit(3) from exc
 
+    workers = _worker_count()
+    if workers > 1:
+        if service in PREFORK_SERVICES:
+            _run_prefork(module, workers)
+            return
+        print(f"{service} keeps in-memory state; ignoring WORKERS={workers}", file=sys.stderr)
+
     entrypoint = _resolve_entrypoint(module)
     entrypoint()
 
@@ -1,15 +1,28 @@
 import json
 import os
-import threading
 import time
+from bisect import bisect_right
 from http.server import HTTPServer
 from typing import Dict, List
 
 from python_architecture.common.http import JSONRequestHandler
+from python_architecture.common.metrics import LOCK_WAIT_BUCKETS, ServiceMetrics, TimedLock
+from python_architecture.common.sharding import AuctionIdGenerator
+
+
+class AuctionHandler(JSONRequestHandler):
+    routes = []
+    metrics = ServiceMetrics()
 
 
 auctions: Dict[str, dict] = {}
-_lock = threading.Lock()
+# Auction ids in ascending order.  Ids from the generator only ever increase,
+# so new ids are appended and the list stays sorted for cursor pagination.
+_ordered_ids: List[str] = []
+_ids = AuctionIdGenerator(int(os.getenv("AUCTION_SHARD_ID", "0")))
+_lock = TimedLock(AuctionHandler.metrics.histogram(
+    "auction_lock_wait_seconds", "Time spent waiting for the auction store lock.", buckets=LOCK_WAIT_BUCKETS))
+AuctionHandler.metrics.gauge("auctions", "Auctions held by this service.", callback=lambda: len(auctions))
 
 
 def _clone_auction(auction: dict) -> dict:
@@ -43,12 +56,9 @@ def _expire_if_needed(auction: dict) -> bool:
     return False
 
 
-class AuctionHandler(JSONRequestHandler):
-    routes = []
-
+def _new_auction(payload: dict):
+    """Validate *payload* and return ``(error, auction)``; the id is set on insert."""
 
-@AuctionHandler.route("POST", "/auctions")
-def create_auction(handler, payload, params):
     name = payload.get("name")
     starting_bid = payload.get("starting_bid", 0)
     duration = payload.get("duration_seconds")
@@ -57,16 +67,15 @@ def create_auction(handler, payload, params):
     try:
         duration = int(duration)
     except (TypeError, ValueError):
-        return 400, {"error": "duration_seconds must be an integer"}
+        return "duration_seconds must be an integer", None
     if duration < 0:
-        return 400, {"error": "duration_seconds cannot be negative"}
+        return "duration_seconds cannot be negative", None
     if not name:
-        return 400, {"error": "name is required"}
-    if starting_bid <= 0:
-        return 400, {"error": "starting_bid must be positive"}
-    auction_id = str(int(time.time() * 1000))
-    auction = {
-        "id": auction_id,
+        return "name is required", None
+    if not isinstance(starting_bid, (int, float)) or starting_bid <= 0:
+        return "starting_bid must be positive", None
+    return None, {
+        "id": "",
         "name": name,
         "description": payload.get("description", ""),
         "starting_bid": starting_bid,
@@ -78,18 +87,73 @@ def create_auction(handler, payload, params):
         "closing_time": time.time() + duration if duration else 0,
         "bids": [],
     }
+
+
+def _insert(auction: dict):
+    # Ids are minted under the lock so _ordered_ids stays sorted even when
+    # several requests create auctions at once.  Caller holds _lock.
+    auction["id"] = _ids.next_id()
+    auctions[auction["id"]] = auction
+    _ordered_ids.append(auction["id"])
+
+
+@AuctionHandler.route("POST", "/auctions")
+def create_auction(handler, payload, params):
+    error, auction = _new_auction(payload)
+    if error:
+        return 400, {"error": error}
     with _lock:
-        auctions[auction_id] = auction
+        _insert(auction)
     return 201, {"auction": _clone_auction(auction)}
 
 
+@AuctionHandler.route("POST", "/auctions/batch")
+def create_auctions(handler, payload, params):
+    """Create many auctions under a single lock acquisition.
+
+    Invalid entries are skipped and reported in ``errors`` by their index in
+    the request, so one bad row does not reject the whole batch.
+    """
+
+    items = payload.get("auctions")
+    if not isinstance(items, list):
+        return 400, {"error": "auctions must be a list"}
+    created, errors = [], []
+    for index, item in enumerate(items):
+        error, auction = _new_auction(item) if isinstance(item, dict) else ("entry must be an object", None)
+        if error:
+            errors.append({"index": index, "error": error})
+        else:
+            created.append(auction)
+    with _lock:
+        for auction in created:
+            _insert(auction)
+    return 201, {"auctions": [_clone_auction(auction) for auction in created], "errors": errors}
+
+
 @AuctionHandler.route("GET", "/auctions")
 def list_auctions(handler, payload, params):
+    query = handler.query_params()
+    after = query.get("after", "")
+    limit = query.get("limit")
+    try:
+        limit = int(limit) if limit else None
+    except ValueError:
+        return 400, {"error": "limit must be an integer"}
+    if limit is not None and limit <= 0:
+        return 400, {"error": "limit must be positive"}
     with _lock:
-        for item in auctions.values():
+        start = bisect_right(_ordered_ids, after) if after else 0
+        stop = len(_ordered_ids) if limit is None else start + limit
+        page = [auctions[auction_id] for auction_id in _ordered_ids[start:stop]]
+        for item in page:
             _expire_if_needed(item)
-        values = [_clone_auction(item) for item in auctions.values()]
-    return 200, {"auctions": values}
+        values = [_clone_auction(item) for item in page]
+        has_more = stop < len(_ordered_ids)
+    response = {"auctions": values}
+    if has_more and values:
+        response["next_after"] = values[-1]["id"]
+    return 200, response
 
 
 @AuctionHandler.route("GET", "/auctions/<auction_id>")
@@ -149,10 +213,15 @@ def close_auction(handler, payload, params):
     return 200, {"auction": closed}
 
 
+def build_server(address=None) -> HTTPServer:
+    if address is None:
+        address = ("0.0.0.0", int(os.getenv("AUCTION_SERVICE_PORT", "8001")))
+    return HTTPServer(address, AuctionHandler)
+
+
 def run():
-    port = int(os.getenv("AUCTION_SERVICE_PORT", "8001"))
-    server = HTTPServer(("0.0.0.0", port), AuctionHandler)
-    print(f"Auction service listening on {port}")
+    server = build_server()
+    print(f"Auction service listening on {server.server_address[1]}")
     server.serve_forever()
 
 
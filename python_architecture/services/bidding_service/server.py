@@ -2,10 +2,12 @@ import os
 from http.server import HTTPServer
 
 from python_architecture.common.http import JSONRequestHandler
+from python_architecture.common.metrics import ServiceMetrics
 
 
 class BiddingHandler(JSONRequestHandler):
     routes = []
+    metrics = ServiceMetrics()
 
 
 @BiddingHandler.route("POST", "/validate")
@@ -20,10 +22,15 @@ def validate_bid(handler, payload, params):
     return 200, {"ok": True, "message": "Bid accepted"}
 
 
+def build_server(address=None) -> HTTPServer:
+    if address is None:
+        address = ("0.0.0.0", int(os.getenv("BIDDING_SERVICE_PORT", "8002")))
+    return HTTPServer(address, BiddingHandler)
+
+
 def run():
-    port = int(os.getenv("BIDDING_SERVICE_PORT", "8002"))
-    server = HTTPServer(("0.0.0.0", port), BiddingHandler)
-    print(f"Bidding service listening on {port}")
+    server = build_server()
+    print(f"Bidding service listening on {server.server_address[1]}")
     server.serve_forever()
 
 
@@ -1,58 +1,114 @@
+import functools
 import os
-from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
-from urllib import request
+from http.server import SimpleHTTPRequestHandler
+from urllib import error, request
+
+from python_architecture.common import tracing
+from python_architecture.common.admission import CapacityClass, PooledHTTPServer
+from python_architecture.common.http import (
+    InstrumentedHandlerMixin,
+    InvalidRequestBody,
+    RequestBody,
+    open_request_body,
+)
+from python_architecture.common.metrics import ServiceMetrics
+from python_architecture.common.tracing import TRACEPARENT_HEADER, SpanContext
 
 GATEWAY_URL = os.getenv("GATEWAY_URL", "http://gateway:8000")
+STATIC_ROOT = os.path.dirname(__file__)
+
 
+class FrontendHandler(InstrumentedHandlerMixin, SimpleHTTPRequestHandler):
+    metrics = ServiceMetrics()
+    # See GatewayHandler.timeout.
+    timeout = float(os.getenv("FRONTEND_CLIENT_TIMEOUT", "10"))
 
-class FrontendHandler(SimpleHTTPRequestHandler):
     def do_GET(self):
-        if self.path.startswith("/api/"):
+        if self.path == "/metrics":
+            self.send_metrics()
+        elif self.path.startswith("/api/"):
+            self._route = "api_proxy"
             self.forward_request("GET")
         else:
+            self._route = "static"
             if self.path == "/":
                 self.path = "/static/index.html"
             return super().do_GET()
 
     def do_POST(self):
         if self.path.startswith("/api/"):
+            self._route = "api_proxy"
             self.forward_request("POST")
         else:
             self.send_error(405, "Method not allowed")
 
     def forward_request(self, method: str):
         target = f"{GATEWAY_URL}{self.path}"
-        length = int(self.headers.get("Content-Length", "0"))
-        data = self.rfile.read(length) if length else None
+        # Pass the body through as it arrives so large uploads such as catalog
+        # imports are never buffered here.  A chunked upload is decoded here
+        # and re-chunked by urllib, since its length is not known up front.
+        data = open_request_body(self.headers, self.rfile)
         req = request.Request(target, data=data, method=method)
         req.add_header("Content-Type", self.headers.get("Content-Type", "application/json"))
-        try:
-            with request.urlopen(req) as resp:
-                self.send_response(resp.status)
-                for key, value in resp.headers.items():
-                    if key.lower() == "transfer-encoding":
-                        continue
-                    self.send_header(key, value)
-                self.end_headers()
-                content_type = resp.headers.get("Content-Type", "")
-                try:
+        if isinstance(data, RequestBody):
+            req.add_header("Content-Length", str(data.remaining))
+        forwarded = self.headers.get("X-Forwarded-For")
+        client_ip = self.client_address[0]
+        req.add_header("X-Forwarded-For", f"{forwarded}, {client_ip}" if forwarded else client_ip)
+        parent = SpanContext.from_header(self.headers.get(TRACEPARENT_HEADER))
+        with tracing.tracer.span(f"{method} {self.path.split('?')[0]}", parent, "FrontendHandler", "server") as span:
+            req.add_header(TRACEPARENT_HEADER, span.context.to_header())
+            try:
+                resp = request.urlopen(req)
+            except error.HTTPError as exc:
+                # Relay error replies such as 429 or 503 with their headers
+                # (Retry-After) and body instead of masking them as a 502.
+                resp = exc
+            except InvalidRequestBody as exc:
+                span.set_attribute("status", 400)
+                self.send_error(400, f"Invalid request body: {exc}")
+                return
+            except Exception as exc:
+                span.set_attribute("status", 502)
+                self.send_error(502, f"Gateway error: {exc}")
+                return
+            span.set_attribute("status", resp.status)
+        with resp:
+            self.send_response(resp.status)
+            for key, value in resp.headers.items():
+                if key.lower() == "transfer-encoding":
+                    continue
+                self.send_header(key, value)
+            self.end_headers()
+            content_type = resp.headers.get("Content-Type", "")
+            try:
+                chunk = resp.read(8192)
+                while chunk:
+                    self.wfile.write(chunk)
+                    if "text/event-stream" in content_type:
+                        self.wfile.flush()
                     chunk = resp.read(8192)
-                    while chunk:
-                        self.wfile.write(chunk)
-                        if "text/event-stream" in content_type:
-                            self.wfile.flush()
-                        chunk = resp.read(8192)
-                except BrokenPipeError:
-                    pass
-        except Exception as exc:
-            self.send_error(502, f"Gateway error: {exc}")
+            except BrokenPipeError:
+                pass
+
+
+def build_server(address=None) -> PooledHTTPServer:
+    if address is None:
+        address = ("0.0.0.0", int(os.getenv("FRONTEND_PORT", "8080")))
+    handler = functools.partial(FrontendHandler, directory=STATIC_ROOT)
+    capacity = [
+        CapacityClass("stream", int(os.getenv("FRONTEND_STREAM_SLOTS", "256")), 0, ("/api/updates/stream",)),
+        CapacityClass("bulk", int(os.getenv("FRONTEND_BULK_SLOTS", "4")), int(os.getenv("FRONTEND_BULK_QUEUE", "8")),
+                      ("/api/auctions/import", "/api/auctions/export", "/api/history/export")),
+        CapacityClass(
+            "default", int(os.getenv("FRONTEND_POOL_THREADS", "32")), int(os.getenv("FRONTEND_POOL_QUEUE", "64"))),
+    ]
+    return PooledHTTPServer(address, handler, capacity, FrontendHandler.metrics)
 
 
 def run():
-    port = int(os.getenv("FRONTEND_PORT", "8080"))
-    os.chdir(os.path.dirname(__file__))
-    server = ThreadingHTTPServer(("0.0.0.0", port), FrontendHandler)
-    print(f"Frontend listening on {port}")
+    server = build_server()
+    print(f"Frontend listening on {server.server_address[1]}")
     server.serve_forever()
 
 
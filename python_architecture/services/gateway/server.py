@@ -1,46 +1,168 @@
+import csv
+import heapq
+import http.client
+import itertools
 import json
+import math
 import os
+import socket
 import threading
-from http.server import ThreadingHTTPServer
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from queue import Empty, Queue
-from urllib import error, request
-
-from python_architecture.common.http import JSONRequestHandler, StreamingResponse
+from urllib import parse
+
+from python_architecture.common import tracing
+from python_architecture.common.admission import CapacityClass, PooledHTTPServer, TokenBucketLimiter
+from python_architecture.common.http import (
+    JSONRequestHandler,
+    RequestBody,
+    StreamingResponse,
+    dispatch_local,
+    resolve_local_service,
+)
+from python_architecture.common.metrics import ServiceMetrics
+from python_architecture.common.resilience import BreakerRegistry, UpstreamPolicy, hedged
+from python_architecture.common.sharding import HashRing, shard_from_id
+from python_architecture.common.tracing import TRACEPARENT_HEADER
 
 AUCTION_SERVICE = os.getenv("AUCTION_SERVICE_URL", "http://auction_service:8001")
 BIDDING_SERVICE = os.getenv("BIDDING_SERVICE_URL", "http://bidding_service:8002")
 HISTORY_SERVICE = os.getenv("HISTORY_SERVICE_URL", "http://history_service:8003")
+# Comma-separated auction shard URLs.  The URL at position N serves the
+# auctions whose id ends in "-N" (see common/sharding.py).
+AUCTION_SHARDS = [
+    url.strip() for url in os.getenv("AUCTION_SERVICE_URLS", AUCTION_SERVICE).split(",") if url.strip()
+]
+_auction_ring = HashRing([f"shard-{index}" for index in range(len(AUCTION_SHARDS))])
+# Token buckets for bid submissions: rate is bids per second, burst is the
+# bucket size.  The limits are off unless a rate is configured.  They apply
+# to the whole gateway; pre-forked workers each get a share (scale_limits).
+IP_BID_RATE = float(os.getenv("GATEWAY_IP_BID_RATE", "0"))
+IP_BID_BURST = float(os.getenv("GATEWAY_IP_BID_BURST", "100"))
+BIDDER_BID_RATE = float(os.getenv("GATEWAY_BIDDER_BID_RATE", "0"))
+BIDDER_BID_BURST = float(os.getenv("GATEWAY_BIDDER_BID_BURST", "20"))
+_ip_bid_limiter = TokenBucketLimiter(IP_BID_RATE, IP_BID_BURST)
+_bidder_bid_limiter = TokenBucketLimiter(BIDDER_BID_RATE, BIDDER_BID_BURST)
+# Hosts or IPs of the proxies (normally the frontend) whose X-Forwarded-For
+# header is believed.  The header is ignored on connections from anyone else,
+# so clients reaching the gateway directly cannot pick their own IP.
+TRUSTED_PROXIES = [
+    host.strip() for host in os.getenv("GATEWAY_TRUSTED_PROXIES", "").split(",") if host.strip()
+]
+# (expires_at, addresses) for the resolved TRUSTED_PROXIES.
+_trusted_proxy_cache = (0.0, frozenset())
+_scatter_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("GATEWAY_SCATTER_WORKERS", "16")), thread_name_prefix="gateway-scatter")
+# Timeouts, retries, hedging and circuit-breaker thresholds per downstream
+# service, overridable with UPSTREAM_<NAME> (see common/resilience.py).
+# History is off the critical path of a bid, so it gets tight timeouts and
+# its writes are never retried: when it struggles, bids go through without it.
+UPSTREAM_POLICIES = {
+    "auction": UpstreamPolicy.from_env(
+        "auction", connect_timeout=0.5, read_timeout=2.0, retries=2, hedge_after=0.2),
+    "bidding": UpstreamPolicy.from_env("bidding", connect_timeout=0.5, read_timeout=1.0, retries=2),
+    "history": UpstreamPolicy.from_env("history", connect_timeout=0.25, read_timeout=1.0, retries=1),
+}
+_default_policy = UpstreamPolicy()
+_breakers = BreakerRegistry()
+_hedge_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("GATEWAY_HEDGE_WORKERS", "64")), thread_name_prefix="gateway-hedge")
+# Catalog imports insert this many auctions per call to the auction service,
+# and exports fetch this many records per upstream page.
+IMPORT_BATCH_SIZE = int(os.getenv("GATEWAY_IMPORT_BATCH_SIZE", "200"))
+IMPORT_MAX_ERRORS = 100
+EXPORT_PAGE_SIZE = int(os.getenv("GATEWAY_EXPORT_PAGE_SIZE", "500"))
+NDJSON_HEADERS = {"Content-Type": "application/x-ndjson", "Cache-Control": "no-cache"}
+
+
+def configure_auction_shards(urls):
+    """Point the gateway at a new list of auction shard URLs."""
+
+    global AUCTION_SHARDS, _auction_ring
+    _auction_ring = HashRing([f"shard-{index}" for index in range(len(urls))])
+    AUCTION_SHARDS = list(urls)
 
 
 class GatewayHandler(JSONRequestHandler):
     routes = []
+    metrics = ServiceMetrics()
+    # Seconds a client may stay silent, while sending its request or reading
+    # a response, before its worker gives up on the connection.
+    timeout = float(os.getenv("GATEWAY_CLIENT_TIMEOUT", "10"))
+
+
+_upstream_latency = GatewayHandler.metrics.histogram(
+    "upstream_request_duration_seconds", "Latency of calls to downstream services.",
+    ("upstream", "method", "status"))
+_upstream_retries = GatewayHandler.metrics.counter(
+    "upstream_retries_total", "Calls to downstream services that were retried.", ("upstream",))
+_upstream_hedges = GatewayHandler.metrics.counter(
+    "upstream_hedged_requests_total", "Duplicate requests sent because a GET was slow.", ("upstream",))
+_upstream_failures = GatewayHandler.metrics.counter(
+    "upstream_failures_total", "Failed calls to downstream services.", ("upstream", "reason"))
+GatewayHandler.metrics.gauge(
+    "upstream_circuit_state", "Circuit breaker state per upstream: 0 closed, 1 half-open, 2 open.",
+    ("upstream",), callback=_breakers.states)
 
 
 class _EventBus:
     def __init__(self):
         self._lock = threading.Lock()
-        self._subscribers = []
+        # Maps each subscriber queue to a stable id used as a metrics label.
+        self._subscribers = {}
+        self._ids = itertools.count(1)
+        # Called with every published message so that other processes can
+        # deliver it to their own subscribers (see bind_fanout).
+        self.relay = None
 
     def subscribe(self) -> Queue:
         queue: Queue = Queue()
         with self._lock:
-            self._subscribers.append(queue)
+            self._subscribers[queue] = next(self._ids)
         return queue
 
     def unsubscribe(self, queue: Queue):
         with self._lock:
-            if queue in self._subscribers:
-                self._subscribers.remove(queue)
+            self._subscribers.pop(queue, None)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def queue_depths(self):
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        return {(str(subscriber_id),): queue.qsize() for queue, subscriber_id in subscribers}
 
     def publish(self, event_type: str, payload):
         message = {"type": event_type, "data": payload}
+        self.deliver(message)
+        relay = self.relay
+        if relay is not None:
+            relay(message)
+
+    def deliver(self, message):
+        """Hand *message* to local subscribers only, without relaying it."""
+
         with self._lock:
             subscribers = list(self._subscribers)
         for queue in subscribers:
             queue.put(message)
 
+    def close(self):
+        """End every open stream; each iterator stops when it reads ``None``."""
+
+        self.deliver(None)
+
 
 _updates_bus = _EventBus()
+GatewayHandler.metrics.gauge(
+    "sse_subscribers", "Connected server-sent event subscribers.", callback=_updates_bus.subscriber_count)
+GatewayHandler.metrics.gauge(
+    "sse_subscriber_queue_depth", "Undelivered messages per server-sent event subscriber.", ("subscriber",),
+    callback=_updates_bus.queue_depths)
 
 
 def _broadcast_auction(auction: dict):
@@ -53,28 +175,172 @@ def _broadcast_history(event: dict):
         _updates_bus.publish("history", event)
 
 
-def call_service(method: str, url: str, payload=None):
+def call_service(method: str, url: str, payload=None, upstream: str = None, idempotent: bool = None):
+    """Call a downstream service and return ``(status, body)``.
+
+    *upstream* selects the entry of ``UPSTREAM_POLICIES`` to apply.  Only
+    idempotent calls are retried; by default that means GETs.  Timeouts,
+    unreachable hosts and open circuits come back as 504 or 503 responses
+    instead of raising.
+    """
+
+    target = parse.urlsplit(url)
+    started = time.perf_counter()
+    status = "error"
+    with tracing.tracer.span(f"{method} {target.path}", service="GatewayHandler", kind="client") as span:
+        span.set_attribute("upstream", target.netloc)
+        try:
+            local = resolve_local_service(url)
+            if local is not None:
+                status, body = dispatch_local(local[0], method, local[1], payload)
+            else:
+                if idempotent is None:
+                    idempotent = method == "GET"
+                policy = UPSTREAM_POLICIES.get(upstream, _default_policy)
+                headers = {TRACEPARENT_HEADER: span.context.to_header()}
+                status, body = _call_remote(method, url, payload, headers, policy, idempotent)
+            return status, body
+        finally:
+            span.set_attribute("status", status)
+            _upstream_latency.observe(time.perf_counter() - started, (target.netloc, method, str(status)))
+
+
+def _call_remote(method: str, url: str, payload, headers, policy: UpstreamPolicy, idempotent: bool):
+    netloc = parse.urlsplit(url).netloc
+    breaker = _breakers.get(netloc, policy)
+    attempts = 1 + (policy.retries if idempotent else 0)
+
+    def attempt():
+        return _send(method, url, payload, headers, policy)
+
+    result = None
+    for number in range(attempts):
+        if number:
+            time.sleep(policy.backoff_delay(number))
+        if not breaker.allow():
+            _upstream_failures.inc(labels=(netloc, "circuit_open"))
+            return result or (503, {"error": f"{netloc} is unavailable (circuit open)"})
+        if number:
+            _upstream_retries.inc(labels=(netloc,))
+        try:
+            if method == "GET" and policy.hedge_after > 0:
+                result = hedged(_hedge_pool, attempt, policy.hedge_after,
+                                lambda: _upstream_hedges.inc(labels=(netloc,)))
+            else:
+                result = attempt()
+            reason = "server_error"
+        except TimeoutError:
+            result, reason = (504, {"error": f"{netloc} timed out"}), "timeout"
+        except (OSError, http.client.HTTPException) as exc:
+            result, reason = (503, {"error": f"{netloc} is unreachable: {exc}"}), "connection"
+        except Exception:
+            # A bug on our side, e.g. a payload that cannot be encoded, says
+            # nothing about the upstream's health.
+            breaker.release()
+            raise
+        if result[0] < 500:
+            breaker.record_success()
+            return result
+        breaker.record_failure()
+        _upstream_failures.inc(labels=(netloc, reason))
+    return result
+
+
+def _send(method: str, url: str, payload, headers, policy: UpstreamPolicy):
+    target = parse.urlsplit(url)
+    connection_class = http.client.HTTPSConnection if target.scheme == "https" else http.client.HTTPConnection
+    connection = connection_class(target.hostname, target.port, timeout=policy.connect_timeout)
+    path = f"{target.path or '/'}?{target.query}" if target.query else target.path or "/"
     data = json.dumps(payload).encode("utf-8") if payload is not None else None
-    req = request.Request(url, data=data, method=method)
-    req.add_header("Content-Type", "application/json")
     try:
-        with request.urlopen(req) as resp:
-            body = resp.read()
-            return resp.status, json.loads(body.decode("utf-8")) if body else {}
-    except error.HTTPError as exc:
-        body = exc.read().decode("utf-8")
+        connection.connect()
+        # http.client applies one timeout to every socket operation; switch
+        # from the connect timeout to the read timeout once connected.
+        connection.sock.settimeout(policy.read_timeout)
+        connection.request(method, path, body=data, headers={"Content-Type": "application/json", **headers})
+        resp = connection.getresponse()
+        body = resp.read()
+    finally:
+        connection.close()
+    if resp.status < 400:
         try:
-            payload = json.loads(body) if body else {}
-        except json.JSONDecodeError:
-            payload = {"error": body or exc.reason}
-        if "error" not in payload:
-            payload.setdefault("error", exc.reason)
-        return exc.code, payload
+            payload = json.loads(body.decode("utf-8")) if body else {}
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            return 502, {"error": f"{target.netloc} returned an invalid response"}
+        return resp.status, payload
+    text = body.decode("utf-8", "replace")
+    try:
+        payload = json.loads(text) if text else {}
+    except json.JSONDecodeError:
+        payload = None
+    if not isinstance(payload, dict):
+        payload = {"error": text or resp.reason}
+    payload.setdefault("error", resp.reason)
+    return resp.status, payload
+
+
+def _auction_url(auction_id: str) -> str:
+    shard = shard_from_id(auction_id)
+    if shard is None or shard >= len(AUCTION_SHARDS):
+        # Ids minted before sharding carry no shard.  They can only live on
+        # the original single auction service, which is shard 0.
+        shard = 0
+    return AUCTION_SHARDS[shard]
+
+
+def _auction_resource(auction_id: str) -> str:
+    """URL of *auction_id* on its shard, with the id percent-encoded."""
+
+    return f"{_auction_url(auction_id)}/auctions/{parse.quote(auction_id, safe='')}"
+
+
+def _placement_url() -> str:
+    return AUCTION_SHARDS[_auction_ring.node_for(uuid.uuid4().hex)]
+
+
+def _scatter(calls, upstream: str):
+    """Issue ``call_service`` for every ``(method, url)`` pair concurrently."""
+
+    if len(calls) == 1:
+        return [call_service(*calls[0], upstream=upstream)]
+    futures = [_scatter_pool.submit(tracing.bind(call_service), *call, upstream=upstream) for call in calls]
+    return [future.result() for future in futures]
+
+
+def _gather_auctions(after: str = "", limit=None):
+    """Merge auction listings from every shard in id (creation) order."""
+
+    query = {}
+    if after:
+        query["after"] = after
+    if limit is not None:
+        query["limit"] = limit
+    suffix = f"?{parse.urlencode(query)}" if query else ""
+    pages = []
+    has_more = False
+    for status, resp in _scatter([("GET", f"{url}/auctions{suffix}") for url in AUCTION_SHARDS], "auction"):
+        if status != 200:
+            return status, resp
+        pages.append(resp.get("auctions", []))
+        has_more = has_more or "next_after" in resp
+    merged = heapq.merge(*pages, key=lambda auction: auction["id"])
+    if limit is None:
+        auctions = list(merged)
+    else:
+        auctions = list(itertools.islice(merged, limit + 1))
+        has_more = has_more or len(auctions) > limit
+        auctions = auctions[:limit]
+    response = {"auctions": auctions}
+    if has_more and auctions:
+        response["next_after"] = auctions[-1]["id"]
+    return 200, response
 
 
 @GatewayHandler.route("POST", "/api/auctions")
 def create_auction(handler, payload, params):
-    status, resp = call_service("POST", f"{AUCTION_SERVICE}/auctions", payload)
+    status, resp = call_service("POST", f"{_placement_url()}/auctions", payload, upstream="auction")
     if status >= 400:
         return status, resp
     auction = resp.get("auction")
@@ -84,7 +350,8 @@ def create_auction(handler, payload, params):
             "event_type": "created",
             "payload": auction["name"],
         }
-        _, history_resp = call_service("POST", f"{HISTORY_SERVICE}/events", history_payload)
+        _, history_resp = call_service(
+            "POST", f"{HISTORY_SERVICE}/events", history_payload, upstream="history")
         _broadcast_auction(auction)
         _broadcast_history(history_resp.get("event"))
     return 201, resp
@@ -92,7 +359,15 @@ def create_auction(handler, payload, params):
 
 @GatewayHandler.route("GET", "/api/auctions")
 def list_auctions(handler, payload, params):
-    status, resp = call_service("GET", f"{AUCTION_SERVICE}/auctions")
+    query = handler.query_params()
+    limit = query.get("limit")
+    try:
+        limit = int(limit) if limit else None
+    except ValueError:
+        return 400, {"error": "limit must be an integer"}
+    if limit is not None and limit <= 0:
+        return 400, {"error": "limit must be positive"}
+    status, resp = _gather_auctions(query.get("after", ""), limit)
     return status, resp
 
 
@@ -106,7 +381,7 @@ def _execute_bid(auction_id: str, bidder: str, amount):
     if amount_value <= 0:
         return 400, {"error": "amount must be positive"}
 
-    status, current = call_service("GET", f"{AUCTION_SERVICE}/auctions/{auction_id}")
+    status, current = call_service("GET", _auction_resource(auction_id), upstream="auction")
     if status != 200:
         return status, current
     auction = current.get("auction")
@@ -121,16 +396,18 @@ def _execute_bid(auction_id: str, bidder: str, amount):
         "current_bid": auction.get("current_bid"),
         "bidder": bidder,
     }
-    status, validation = call_service("POST", f"{BIDDING_SERVICE}/validate", validation_payload)
+    # Validation has no side effects, so it may be retried like a GET.
+    status, validation = call_service(
+        "POST", f"{BIDDING_SERVICE}/validate", validation_payload, upstream="bidding", idempotent=True)
     if status >= 400:
         return status, validation
     if not validation.get("ok"):
         return 409, validation
 
-    status, update = call_service("POST", f"{AUCTION_SERVICE}/auctions/{auction_id}/bid", {
+    status, update = call_service("POST", f"{_auction_resource(auction_id)}/bid", {
         "bidder": bidder,
         "amount": amount_value,
-    })
+    }, upstream="auction")
     if status >= 400:
         return status, update
 
@@ -138,17 +415,66 @@ def _execute_bid(auction_id: str, bidder: str, amount):
         "auction_id": auction_id,
         "event_type": "bid",
         "payload": f"{bidder} bid ${amount_value}",
-    })
+    }, upstream="history")
     _broadcast_auction(update.get("auction"))
     _broadcast_history(history_resp.get("event"))
     return 200, update
 
 
+def _trusted_proxy_addresses() -> frozenset:
+    """Resolve TRUSTED_PROXIES, re-resolving periodically so restarts are seen."""
+
+    global _trusted_proxy_cache
+    expires_at, addresses = _trusted_proxy_cache
+    now = time.monotonic()
+    if now < expires_at:
+        return addresses
+    resolved, complete = set(), True
+    for host in TRUSTED_PROXIES:
+        try:
+            resolved.update(info[4][0] for info in socket.getaddrinfo(host, None))
+        except socket.gaierror:
+            complete = False
+    addresses = frozenset(resolved)
+    # Retry soon if a proxy did not resolve yet, e.g. while it is starting.
+    _trusted_proxy_cache = (now + (30.0 if complete else 1.0), addresses)
+    return addresses
+
+
+def _client_ip(handler) -> str:
+    peer = handler.client_address[0]
+    if TRUSTED_PROXIES and peer in _trusted_proxy_addresses():
+        forwarded = handler.headers.get("X-Forwarded-For", "")
+        if forwarded:
+            # The right-most entry was appended by our own proxy.
+            return forwarded.split(",")[-1].strip()
+    return peer
+
+
+def _bid_rate_wait(handler, bidder: str) -> float:
+    """Charge one bid to the client's and the bidder's buckets.
+
+    Returns 0 when the bid may proceed, otherwise the seconds to wait.
+    """
+
+    wait = _ip_bid_limiter.acquire(_client_ip(handler))
+    if wait:
+        return wait
+    return _bidder_bid_limiter.acquire(bidder) if bidder else 0.0
+
+
+def _rate_limited(wait: float):
+    return 429, {"error": "Too many bids, retry later"}, {"Retry-After": str(max(1, math.ceil(wait)))}
+
+
 @GatewayHandler.route("POST", "/api/auctions/<auction_id>/bid")
 def place_bid(handler, payload, params):
     auction_id = params.get("auction_id")
     bidder = payload.get("bidder", "")
     amount = payload.get("amount")
+    wait = _bid_rate_wait(handler, bidder)
+    if wait:
+        return _rate_limited(wait)
     status, resp = _execute_bid(auction_id, bidder, amount)
     return status, resp
 
@@ -162,10 +488,16 @@ def place_bulk_bids(handler, payload, params):
 
     results = []
     accepted = 0
+    longest_wait = 0.0
     for entry in bids:
         bidder = entry.get("bidder", "") if isinstance(entry, dict) else ""
         amount = entry.get("amount") if isinstance(entry, dict) else None
-        status, resp = _execute_bid(auction_id, bidder, amount)
+        wait = _bid_rate_wait(handler, bidder)
+        if wait:
+            longest_wait = max(longest_wait, wait)
+            status, resp = 429, {"error": "Too many bids, retry later"}
+        else:
+            status, resp = _execute_bid(auction_id, bidder, amount)
         results.append({
             "bidder": bidder,
             "amount": amount,
@@ -175,18 +507,22 @@ def place_bulk_bids(handler, payload, params):
         if status < 400:
             accepted += 1
 
-    overall_status = 200 if accepted else 409
-    return overall_status, {
+    body = {
         "submitted": len(bids),
         "accepted": accepted,
         "results": results,
     }
+    if not accepted and all(result["status"] == 429 for result in results):
+        return 429, body, _rate_limited(longest_wait)[2]
+    overall_status = 200 if accepted else 409
+    return overall_status, body
 
 
 @GatewayHandler.route("POST", "/api/auctions/<auction_id>/close")
 def close_auction(handler, payload, params):
     auction_id = params.get("auction_id")
-    status, closed = call_service("POST", f"{AUCTION_SERVICE}/auctions/{auction_id}/close")
+    status, closed = call_service(
+        "POST", f"{_auction_resource(auction_id)}/close", upstream="auction")
     if status >= 400:
         return status, closed
     auction = closed.get("auction")
@@ -195,7 +531,7 @@ def close_auction(handler, payload, params):
             "auction_id": auction_id,
             "event_type": "closed",
             "payload": auction.get("highest_bidder", ""),
-        })
+        }, upstream="history")
         _broadcast_auction(auction)
         _broadcast_history(history_resp.get("event"))
     return 200, closed
@@ -203,18 +539,190 @@ def close_auction(handler, payload, params):
 
 @GatewayHandler.route("GET", "/api/history")
 def get_history(handler, payload, params):
-    status, events = call_service("GET", f"{HISTORY_SERVICE}/events")
+    status, events = call_service("GET", f"{HISTORY_SERVICE}/events", upstream="history")
     return status, events
 
 
+def _decoded_lines(body: RequestBody):
+    # Spreadsheet exports often start with a UTF-8 byte order mark, which
+    # would otherwise end up in the first CSV header or NDJSON record.
+    encoding = "utf-8-sig"
+    for raw in body:
+        yield raw.decode(encoding, "replace")
+        encoding = "utf-8"
+
+
+def _import_records(body: RequestBody, content_type: str):
+    """Yield ``(line, record)`` pairs from an NDJSON or CSV upload.
+
+    Lines that are not valid JSON are yielded with ``None`` as the record.
+    Only the current line or CSV row is held in memory.
+    """
+
+    lines = _decoded_lines(body)
+    if "csv" in content_type:
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError:
+            yield number, None
+
+
+def _number(value):
+    if isinstance(value, str):
+        value = float(value) if value.strip() else 0.0
+        if not math.isfinite(value):
+            raise ValueError(value)
+        return int(value) if value.is_integer() else value
+    return value
+
+
+def _import_item(record):
+    """Map an uploaded record to an auction-service payload, or an error string."""
+
+    if record is None:
+        return "invalid JSON"
+    if not isinstance(record, dict):
+        return "record must be an object"
+    try:
+        starting_bid = _number(record.get("starting_bid") or 0)
+    except ValueError:
+        return "starting_bid must be numeric"
+    try:
+        duration = _number(record.get("duration_seconds") or 0)
+    except ValueError:
+        return "duration_seconds must be an integer"
+    # The auction service would truncate 1.5 to 1; report it instead.
+    if not isinstance(duration, int) and not (isinstance(duration, float) and duration.is_integer()):
+        return "duration_seconds must be an integer"
+    return {
+        "name": str(record.get("name") or "").strip(),
+        "description": record.get("description") or "",
+        "starting_bid": starting_bid,
+        "duration_seconds": duration,
+    }
+
+
+def _import_error(summary: dict, line: int, message: str):
+    summary["failed"] += 1
+    if len(summary["errors"]) < IMPORT_MAX_ERRORS:
+        summary["errors"].append({"line": line, "error": message})
+
+
+def _import_batch(batch, summary: dict):
+    lines = [line for line, _ in batch]
+    status, resp = call_service(
+        "POST", f"{_placement_url()}/auctions/batch", {"auctions": [item for _, item in batch]}, upstream="auction")
+    summary["batches"] += 1
+    if status >= 400:
+        for line in lines:
+            _import_error(summary, line, resp.get("error", "import failed"))
+        return
+    for error in resp.get("errors", []):
+        _import_error(summary, lines[error["index"]], error["error"])
+    created = resp.get("auctions", [])
+    if not created:
+        return
+    summary["imported"] += len(created)
+    # One history event and one broadcast per batch rather than per auction.
+    _, history_resp = call_service("POST", f"{HISTORY_SERVICE}/events", {
+        "auction_id": None,
+        "event_type": "imported",
+        "payload": f"{len(created)} auctions imported ({created[0]['id']} to {created[-1]['id']})",
+    }, upstream="history")
+    _updates_bus.publish("auctions", created)
+    _broadcast_history(history_resp.get("event"))
+
+
+@GatewayHandler.route("POST", "/api/auctions/import", stream_body=True)
+def import_auctions(handler, body, params):
+    """Create auctions from an NDJSON (default) or CSV (``text/csv``) upload."""
+
+    content_type = handler.headers.get("Content-Type", "")
+    summary = {"imported": 0, "failed": 0, "batches": 0, "errors": []}
+    batch = []
+    for line, record in _import_records(body, content_type):
+        item = _import_item(record)
+        if isinstance(item, str):
+            _import_error(summary, line, item)
+            continue
+        batch.append((line, item))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            _import_batch(batch, summary)
+            batch = []
+    if batch:
+        _import_batch(batch, summary)
+    if not summary["imported"] and not summary["failed"]:
+        return 400, {"error": "request body contains no records"}
+    summary["errors"].sort(key=lambda error: error["line"])
+    if summary["failed"] > len(summary["errors"]):
+        summary["errors_truncated"] = True
+    return (201 if summary["imported"] else 400), summary
+
+
+def _export(fetch_page):
+    """Stream every record from a paginated upstream listing as NDJSON.
+
+    ``fetch_page(cursor)`` returns ``(status, body, records, next_cursor)``
+    and is called with ``None`` for the first page.  That page is fetched
+    before responding, so an unavailable upstream still gets its own status.
+    After that, only one page is held in memory at a time.  A failure
+    mid-stream ends the output with an ``{"error": ...}`` line.
+    """
+
+    status, resp, records, cursor = fetch_page(None)
+    if status != 200:
+        return status, resp
+
+    def iterator(records, cursor):
+        while True:
+            if records:
+                yield "".join(json.dumps(record) + "\n" for record in records)
+            if cursor is None:
+                return
+            status, resp, records, cursor = fetch_page(cursor)
+            if status != 200:
+                yield json.dumps({"error": resp.get("error", "export interrupted")}) + "\n"
+                return
+
+    return StreamingResponse(200, dict(NDJSON_HEADERS), iterator(records, cursor))
+
+
+def _auction_page(after):
+    status, resp = _gather_auctions(after or "", EXPORT_PAGE_SIZE)
+    return status, resp, resp.get("auctions", []), resp.get("next_after")
+
+
+def _history_page(offset):
+    url = f"{HISTORY_SERVICE}/events?offset={offset or 0}&limit={EXPORT_PAGE_SIZE}"
+    status, resp = call_service("GET", url, upstream="history")
+    return status, resp, resp.get("events", []), resp.get("next_offset")
+
+
+@GatewayHandler.route("GET", "/api/auctions/export")
+def export_auctions(handler, payload, params):
+    return _export(_auction_page)
+
+
+@GatewayHandler.route("GET", "/api/history/export")
+def export_history(handler, payload, params):
+    return _export(_history_page)
+
+
 @GatewayHandler.route("GET", "/api/updates/stream")
 def stream_updates(handler, payload, params):
     subscriber = _updates_bus.subscribe()
 
     def iterator():
         try:
-            status, auctions_resp = call_service("GET", f"{AUCTION_SERVICE}/auctions")
-            status_hist, history_resp = call_service("GET", f"{HISTORY_SERVICE}/events")
+            status, auctions_resp = _gather_auctions()
+            status_hist, history_resp = call_service("GET", f"{HISTORY_SERVICE}/events", upstream="history")
             snapshot = {
                 "auctions": auctions_resp.get("auctions", []) if status == 200 else [],
                 "events": history_resp.get("events", []) if status_hist == 200 else [],
@@ -241,10 +749,51 @@ def stream_updates(handler, payload, params):
     return StreamingResponse(200, headers, iterator())
 
 
+def scale_limits(workers: int):
+    """Give each of *workers* pre-forked processes an equal share of the bid limits.
+
+    Every worker keeps its own token buckets and the kernel spreads
+    connections across workers, so the shares add up to the configured limit.
+    """
+
+    global _ip_bid_limiter, _bidder_bid_limiter
+    _ip_bid_limiter = TokenBucketLimiter(IP_BID_RATE / workers, max(1.0, IP_BID_BURST / workers))
+    _bidder_bid_limiter = TokenBucketLimiter(BIDDER_BID_RATE / workers, max(1.0, BIDDER_BID_BURST / workers))
+
+
+def bind_fanout(channel):
+    """Share SSE updates with sibling worker processes through *channel*."""
+
+    _updates_bus.relay = channel.send
+    channel.start(_updates_bus.deliver)
+
+
+def drain():
+    """Close SSE streams so that a draining worker can exit promptly."""
+
+    _updates_bus.close()
+
+
+def build_server(address=None) -> PooledHTTPServer:
+    if address is None:
+        address = ("0.0.0.0", int(os.getenv("GATEWAY_PORT", "8000")))
+    capacity = [
+        # SSE clients hold a worker for as long as they stay connected, so they
+        # get their own pool and can never take workers away from bids.
+        CapacityClass("stream", int(os.getenv("GATEWAY_STREAM_SLOTS", "256")), 0, ("/api/updates/stream",)),
+        # Imports and exports can run for minutes; cap them so they cannot
+        # occupy every default worker either.
+        CapacityClass("bulk", int(os.getenv("GATEWAY_BULK_SLOTS", "4")), int(os.getenv("GATEWAY_BULK_QUEUE", "8")),
+                      ("/api/auctions/import", "/api/auctions/export", "/api/history/export")),
+        CapacityClass(
+            "default", int(os.getenv("GATEWAY_POOL_THREADS", "32")), int(os.getenv("GATEWAY_POOL_QUEUE", "64"))),
+    ]
+    return PooledHTTPServer(address, GatewayHandler, capacity, GatewayHandler.metrics)
+
+
 def run():
-    port = int(os.getenv("GATEWAY_PORT", "8000"))
-    server = ThreadingHTTPServer(("0.0.0.0", port), GatewayHandler)
-    print(f"Gateway listening on {port}")
+    server = build_server()
+    print(f"Gateway listening on {server.server_address[1]}")
     server.serve_forever()
 
 
@@ -4,6 +4,7 @@ import time
 from http.server import HTTPServer
 
 from python_architecture.common.http import JSONRequestHandler
+from python_architecture.common.metrics import ServiceMetrics
 
 
 _events = []
@@ -12,6 +13,10 @@ _lock = threading.Lock()
 
 class HistoryHandler(JSONRequestHandler):
     routes = []
+    metrics = ServiceMetrics()
+
+
+HistoryHandler.metrics.gauge("history_events", "Events recorded by this service.", callback=lambda: len(_events))
 
 
 @HistoryHandler.route("POST", "/events")
@@ -29,15 +34,34 @@ def record_event(handler, payload, params):
 
 @HistoryHandler.route("GET", "/events")
 def list_events(handler, payload, params):
+    query = handler.query_params()
+    try:
+        offset = int(query.get("offset") or 0)
+        limit = int(query["limit"]) if query.get("limit") else None
+    except ValueError:
+        return 400, {"error": "offset and limit must be integers"}
+    if offset < 0 or (limit is not None and limit <= 0):
+        return 400, {"error": "offset cannot be negative and limit must be positive"}
+    # Events are only ever appended, so an offset is a stable cursor.
     with _lock:
-        events = list(_events)
-    return 200, {"events": events}
+        stop = len(_events) if limit is None else offset + limit
+        events = _events[offset:stop]
+        has_more = stop < len(_events)
+    response = {"events": events}
+    if has_more:
+        response["next_offset"] = stop
+    return 200, response
+
+
+def build_server(address=None) -> HTTPServer:
+    if address is None:
+        address = ("0.0.0.0", int(os.getenv("HISTORY_SERVICE_PORT", "8003")))
+    return HTTPServer(address, HistoryHandler)
 
 
 def run():
-    port = int(os.getenv("HISTORY_SERVICE_PORT", "8003"))
-    server = HTTPServer(("0.0.0.0", port), HistoryHandler)
-    print(f"History service listening on {port}")
+    server = build_server()
+    print(f"History service listening on {server.server_address[1]}")
     server.serve_forever()
 
 
@@ -0,0 +1,92 @@
+"""Print the slowest traces recorded by the services' span exporters.
+
+Each service appends sampled spans to its own JSON-lines file (see
+``python_architecture.common.tracing``).  This command merges any number of
+those files, including rotated backups, groups spans by trace id, and prints
+the slowest traces as a tree so the time spent in every hop is visible::
+
+    python -m python_architecture.trace_report traces/*.jsonl* --top 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+
+def load_spans(paths: Iterable[str]) -> Dict[str, List[dict]]:
+    """Return spans from *paths* grouped by trace id, skipping bad lines."""
+
+    traces: Dict[str, List[dict]] = defaultdict(list)
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        span = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if isinstance(span, dict) and span.get("trace_id"):
+                        traces[span["trace_id"]].append(span)
+        except OSError as exc:
+            print(f"Skipping {path}: {exc}", file=sys.stderr)
+    return traces
+
+
+def trace_duration(spans: List[dict]) -> float:
+    start = min(span["start"] for span in spans)
+    end = max(span["start"] + span["duration"] for span in spans)
+    return end - start
+
+
+def _print_tree(spans: List[dict], out) -> None:
+    ids = {span["span_id"] for span in spans}
+    children: Dict[str, List[dict]] = defaultdict(list)
+    roots = []
+    for span in spans:
+        if span.get("parent_id") in ids:
+            children[span["parent_id"]].append(span)
+        else:
+            roots.append(span)
+    origin = min(span["start"] for span in spans)
+
+    def walk(span: dict, depth: int) -> None:
+        status = span.get("attributes", {}).get("status", "")
+        label = f"{'  ' * depth}{span['name']}"
+        print(
+            f"  {label:<56} {span.get('service', ''):<16} {str(status):>6} "
+            f"+{(span['start'] - origin) * 1000:9.2f}ms {span['duration'] * 1000:9.2f}ms",
+            file=out,
+        )
+        for child in sorted(children[span["span_id"]], key=lambda item: item["start"]):
+            walk(child, depth + 1)
+
+    for root in sorted(roots, key=lambda item: item["start"]):
+        walk(root, 0)
+
+
+def report(traces: Dict[str, List[dict]], top: int, out=sys.stdout) -> None:
+    ranked = sorted(traces.items(), key=lambda item: trace_duration(item[1]), reverse=True)
+    if not ranked:
+        print("No spans found.", file=out)
+        return
+    for trace_id, spans in ranked[:top]:
+        print(f"trace {trace_id}  {trace_duration(spans) * 1000:.2f}ms  {len(spans)} spans", file=out)
+        print(f"  {'span':<56} {'service':<16} {'status':>6} {'offset':>12} {'duration':>11}", file=out)
+        _print_tree(spans, out)
+        print(file=out)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Show the slowest recorded traces with a per-hop breakdown.")
+    parser.add_argument("paths", nargs="+", help="span files written by TRACE_EXPORT_PATH (rotated files too)")
+    parser.add_argument("--top", type=int, default=10, help="number of traces to print (default 10)")
+    args = parser.parse_args(argv)
+    report(load_spans(args.paths), args.top)
+
+
+if __name__ == "__main__":
+    main()